@@ -3,7 +3,8 @@ Clone of 2048 game.
 """
 
 import random
-import poc_2048_gui
+import time
+from collections import OrderedDict
 
 # Directions, DO NOT MODIFY
 UP = 1
@@ -64,6 +65,14 @@ class TwentyFortyEight:
         initial tiles.
         """
         self._cells = [ [0 for dummy_col in range(self._grid_width)] for dummy_row in range(self._grid_height)]        
+        # Empty cells as a list plus the position of each cell in it, so
+        # cells can be added, removed and picked at random in O(1).
+        self._empty = [(row, col) for row in range(self._grid_height)
+                       for col in range(self._grid_width)]
+        self._empty_index = dict((cell, index)
+                                 for index, cell in enumerate(self._empty))
+        # Number of adjacent pairs of equal non-zero tiles.
+        self._pairs = 0
         self.new_tile()
         self.new_tile()
 
@@ -91,7 +100,7 @@ class TwentyFortyEight:
     def move(self, direction):
         """
         Move all tiles in the given direction and add
-        a new tile if any tiles moved.
+        a new tile if any tiles moved.  Returns True if any tiles moved.
         """
         changed = False
         for init_cell in self._initial_tiles[direction]:
@@ -109,34 +118,77 @@ class TwentyFortyEight:
                 row = init_cell[0] + index * OFFSETS[direction][0]
                 col = init_cell[1] + index * OFFSETS[direction][1]
                 if self._cells[row][col] != merged_line[index]:
-                    self._cells[row][col] = merged_line[index]
+                    self._write_cell(row, col, merged_line[index])
                     changed = True
         if changed:
             self.new_tile()
-        
+        return changed
+
     def new_tile(self):
         """
         Create a new tile in a randomly selected empty
         square.  The tile should be 2 90% of the time and
-        4 10% of the time.
-        """
-        row = random.randint(0, self._grid_height - 1)
-        col = random.randint(0, self._grid_width - 1)
-        if self._cells[row][col] == 0:
-            probability = 0.9
-            rand_num = random.random()
-            if rand_num < probability:
-                self._cells[row][col] = 2
-            else:
-                self._cells[row][col] = 4
+        4 10% of the time.  Returns (row, col, value) of the
+        new tile, or None if the board is full.
+        """
+        if not self._empty:
+            return None
+        row, col = random.choice(self._empty)
+        probability = 0.9
+        rand_num = random.random()
+        if rand_num < probability:
+            value = 2
         else:
-            self.new_tile()
+            value = 4
+        self._write_cell(row, col, value)
+        return row, col, value
 
     def set_tile(self, row, col, value):
         """
         Set the tile at position row, col to have the given value.
         """
+        self._write_cell(row, col, value)
+
+    def _write_cell(self, row, col, value):
+        """
+        Store value at row, col and keep the empty cell list and the
+        count of mergeable pairs up to date.
+        """
+        old_value = self._cells[row][col]
+        if old_value == value:
+            return
+        for nrow, ncol in ((row - 1, col), (row + 1, col),
+                           (row, col - 1), (row, col + 1)):
+            if 0 <= nrow < self._grid_height and 0 <= ncol < self._grid_width:
+                other = self._cells[nrow][ncol]
+                if other != 0:
+                    if other == old_value:
+                        self._pairs -= 1
+                    if other == value:
+                        self._pairs += 1
         self._cells[row][col] = value
+        cell = (row, col)
+        if old_value == 0:
+            index = self._empty_index.pop(cell)
+            last = self._empty.pop()
+            if last != cell:
+                self._empty[index] = last
+                self._empty_index[last] = index
+        elif value == 0:
+            self._empty_index[cell] = len(self._empty)
+            self._empty.append(cell)
+
+    def empty_cells(self):
+        """
+        Return a list of the (row, col) positions of all empty cells.
+        """
+        return list(self._empty)
+
+    def is_game_over(self):
+        """
+        Return True if no move can change the board.
+        """
+        return not self._empty and self._pairs == 0
 
     def get_tile(self, row, col):
         """
@@ -144,4 +196,418 @@ class TwentyFortyEight:
         """
         return self._cells[row][col]
 
-poc_2048_gui.run_gui(TwentyFortyEight(4, 4))
\ No newline at end of file
+# Bitboard representation of a 4x4 board.  Each tile is stored as the
+# exponent of its value (0 for an empty cell) in 4 bits, with cell
+# (row, col) at bit offset 4 * (4 * row + col).  Exponents saturate at 15,
+# so the largest representable tile is 32768.
+BITBOARD_SIZE = 4
+ROW_MASK = 0xFFFF
+MAX_EXPONENT = 15
+
+# Row transition tables, indexed by a packed 16-bit row.  They are filled
+# in by build_row_tables() the first time a bitboard is created.
+_ROW_LEFT = []
+_ROW_RIGHT = []
+
+def _encode_row(values):
+    """
+    Pack a list of four tile values into a 16-bit row.
+    """
+    row = 0
+    for index, value in enumerate(values):
+        row |= tile_exponent(value) << (4 * index)
+    return row
+
+def build_row_tables():
+    """
+    Precompute the result of merging every possible row to the left
+    and to the right, reusing merge() so both engines agree.
+    """
+    if _ROW_LEFT:
+        return
+    for row in range(ROW_MASK + 1):
+        values = []
+        for index in range(BITBOARD_SIZE):
+            exponent = (row >> (4 * index)) & 0xF
+            values.append(1 << exponent if exponent else 0)
+        _ROW_LEFT.append(_encode_row(merge(values)))
+        _ROW_RIGHT.append(_encode_row(merge(values[::-1])[::-1]))
+
+def tile_exponent(value):
+    """
+    Return the 4-bit exponent used to store a tile value.
+    """
+    if value == 0:
+        return 0
+    return min(value.bit_length() - 1, MAX_EXPONENT)
+
+def transpose_bitboard(board):
+    """
+    Swap rows and columns of a packed board.
+    """
+    part1 = board & 0xF0F00F0FF0F00F0F
+    part2 = board & 0x0000F0F00000F0F0
+    part3 = board & 0x0F0F00000F0F0000
+    board = part1 | (part2 << 12) | (part3 >> 12)
+    part1 = board & 0xFF00FF0000FF00FF
+    part2 = board & 0x00FF00FF00000000
+    part3 = board & 0x00000000FF00FF00
+    return part1 | (part2 >> 24) | (part3 << 24)
+
+def _apply_row_table(board, table):
+    """
+    Replace each of the four rows of a packed board using table.
+    """
+    return (table[board & ROW_MASK] |
+            table[(board >> 16) & ROW_MASK] << 16 |
+            table[(board >> 32) & ROW_MASK] << 32 |
+            table[(board >> 48) & ROW_MASK] << 48)
+
+def move_bitboard(board, direction):
+    """
+    Return the packed board obtained by sliding board in the given
+    direction.  No new tile is added.
+    """
+    if direction == LEFT:
+        return _apply_row_table(board, _ROW_LEFT)
+    elif direction == RIGHT:
+        return _apply_row_table(board, _ROW_RIGHT)
+    elif direction == UP:
+        return transpose_bitboard(
+            _apply_row_table(transpose_bitboard(board), _ROW_LEFT))
+    else:
+        return transpose_bitboard(
+            _apply_row_table(transpose_bitboard(board), _ROW_RIGHT))
+
+def empty_shifts(board):
+    """
+    Return the bit offsets of all empty cells of a packed board.
+    """
+    return [shift for shift in range(0, 64, 4) if (board >> shift) & 0xF == 0]
+
+class BitboardTwentyFortyEight:
+    """
+    Game logic for a 4x4 board packed into a single 64-bit integer.
+
+    Provides the same interface as TwentyFortyEight, but moves are done
+    with four table lookups per direction instead of list merging.
+    """
+    def __init__(self, grid_height=BITBOARD_SIZE, grid_width=BITBOARD_SIZE):
+        assert grid_height == BITBOARD_SIZE and grid_width == BITBOARD_SIZE, \
+            "bitboard only supports a 4x4 grid"
+        build_row_tables()
+        self._board = 0
+        self.reset()
+
+    def reset(self):
+        """
+        Reset the game so the grid is empty except for two
+        initial tiles.
+        """
+        self._board = 0
+        self.new_tile()
+        self.new_tile()
+
+    def __str__(self):
+        """
+        Return a string representation of the grid for debugging.
+        """
+        result = ""
+        for row in range(BITBOARD_SIZE):
+            line = [self.get_tile(row, col) for col in range(BITBOARD_SIZE)]
+            result += str(line) + "\n"
+        return result
+
+    def get_grid_height(self):
+        """
+        Get the height of the board.
+        """
+        return BITBOARD_SIZE
+
+    def get_grid_width(self):
+        """
+        Get the width of the board.
+        """
+        return BITBOARD_SIZE
+
+    def get_board(self):
+        """
+        Return the packed 64-bit board.
+        """
+        return self._board
+
+    def set_board(self, board):
+        """
+        Replace the packed 64-bit board.
+        """
+        self._board = board
+
+    def move(self, direction):
+        """
+        Move all tiles in the given direction and add
+        a new tile if any tiles moved.  Returns True if any tiles moved.
+        """
+        moved = move_bitboard(self._board, direction)
+        if moved == self._board:
+            return False
+        self._board = moved
+        self.new_tile()
+        return True
+
+    def new_tile(self):
+        """
+        Create a new tile in a randomly selected empty
+        square.  The tile should be 2 90% of the time and
+        4 10% of the time.  Returns (row, col, value) of the
+        new tile.
+        """
+        shift = random.choice(empty_shifts(self._board))
+        if random.random() < 0.9:
+            exponent = 1
+        else:
+            exponent = 2
+        self._board |= exponent << shift
+        cell = shift // 4
+        return cell // BITBOARD_SIZE, cell % BITBOARD_SIZE, 1 << exponent
+
+    def set_tile(self, row, col, value):
+        """
+        Set the tile at position row, col to have the given value.
+        """
+        shift = 4 * (BITBOARD_SIZE * row + col)
+        self._board = ((self._board & ~(0xF << shift)) |
+                       (tile_exponent(value) << shift))
+
+    def get_tile(self, row, col):
+        """
+        Return the value of the tile at position row, col.
+        """
+        exponent = (self._board >> (4 * (BITBOARD_SIZE * row + col))) & 0xF
+        if exponent == 0:
+            return 0
+        return 1 << exponent
+
+# Weights for the expectimax board evaluation.  Each row and each column
+# is scored through a precomputed table, like the row moves above.
+LOST_PENALTY = 200000.0
+MONOTONICITY_POWER = 4.0
+MONOTONICITY_WEIGHT = 47.0
+SUM_POWER = 3.5
+SUM_WEIGHT = 11.0
+MERGES_WEIGHT = 700.0
+EMPTY_WEIGHT = 270.0
+
+# Chance branches less likely than this are evaluated directly.
+PROBABILITY_CUTOFF = 0.0001
+
+# Default time budget of an expectimax move in seconds, safely under
+# 50 ms, and the least factor by which one more ply is expected to
+# multiply the search time.
+EXPECTIMAX_TIME_BUDGET = 0.04
+DEPTH_GROWTH = 2.0
+
+_ROW_HEURISTIC = []
+
+def _row_score(exponents):
+    """
+    Heuristic value of a single row or column given its tile exponents.
+    """
+    total = 0.0
+    empty = 0
+    merges = 0
+    previous = 0
+    counter = 0
+    for exponent in exponents:
+        total += exponent ** SUM_POWER
+        if exponent == 0:
+            empty += 1
+        else:
+            if previous == exponent:
+                counter += 1
+            elif counter > 0:
+                merges += 1 + counter
+                counter = 0
+            previous = exponent
+    if counter > 0:
+        merges += 1 + counter
+    mono_left = 0.0
+    mono_right = 0.0
+    for index in range(1, len(exponents)):
+        first = exponents[index - 1] ** MONOTONICITY_POWER
+        second = exponents[index] ** MONOTONICITY_POWER
+        if exponents[index - 1] > exponents[index]:
+            mono_left += first - second
+        else:
+            mono_right += second - first
+    return (LOST_PENALTY + EMPTY_WEIGHT * empty + MERGES_WEIGHT * merges -
+            MONOTONICITY_WEIGHT * min(mono_left, mono_right) -
+            SUM_WEIGHT * total)
+
+def _build_heuristic_table():
+    """
+    Precompute _row_score() for every possible packed row.
+    """
+    if _ROW_HEURISTIC:
+        return
+    for row in range(ROW_MASK + 1):
+        _ROW_HEURISTIC.append(_row_score(
+            [(row >> (4 * index)) & 0xF for index in range(BITBOARD_SIZE)]))
+
+def evaluate_bitboard(board):
+    """
+    Heuristic value of a packed board, summed over rows and columns.
+    """
+    columns = transpose_bitboard(board)
+    return (_ROW_HEURISTIC[board & ROW_MASK] +
+            _ROW_HEURISTIC[(board >> 16) & ROW_MASK] +
+            _ROW_HEURISTIC[(board >> 32) & ROW_MASK] +
+            _ROW_HEURISTIC[(board >> 48) & ROW_MASK] +
+            _ROW_HEURISTIC[columns & ROW_MASK] +
+            _ROW_HEURISTIC[(columns >> 16) & ROW_MASK] +
+            _ROW_HEURISTIC[(columns >> 32) & ROW_MASK] +
+            _ROW_HEURISTIC[(columns >> 48) & ROW_MASK])
+
+def game_to_bitboard(game):
+    """
+    Pack the tiles of a 4x4 game into a bitboard.
+    """
+    if hasattr(game, "get_board"):
+        return game.get_board()
+    board = 0
+    for row in range(BITBOARD_SIZE):
+        for col in range(BITBOARD_SIZE):
+            shift = 4 * (BITBOARD_SIZE * row + col)
+            board |= tile_exponent(game.get_tile(row, col)) << shift
+    return board
+
+class _SearchTimeout(Exception):
+    """
+    Raised inside the search when the time budget runs out.
+    """
+    pass
+
+class ExpectimaxPlayer:
+    """
+    Expectimax player for a 4x4 TwentyFortyEight game.
+
+    Searches with iterative deepening within the per-move time budget,
+    and keeps evaluated chance nodes in a bounded LRU transposition
+    table that is reused across moves.  A deeper search is only started
+    when the time of the last one says it can finish in the budget.
+    """
+    def __init__(self, time_budget=EXPECTIMAX_TIME_BUDGET, max_depth=8,
+                 table_size=200000):
+        build_row_tables()
+        _build_heuristic_table()
+        self._time_budget = time_budget
+        self._max_depth = max_depth
+        self._table_size = table_size
+        self._table = OrderedDict()
+        self._deadline = None
+        self._depth = 0
+
+    def get_depth(self):
+        """
+        Return the depth of the last completed search.
+        """
+        return self._depth
+
+    def clear(self):
+        """
+        Empty the transposition table.
+        """
+        self._table.clear()
+
+    def get_move(self, game):
+        """
+        Return the best direction for the current position of game, or
+        None if no direction changes the board.
+        """
+        board = game_to_bitboard(game)
+        moves = []
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            moved = move_bitboard(board, direction)
+            if moved != board:
+                moves.append((direction, moved))
+        if not moves:
+            return None
+        best_move = moves[0][0]
+        self._depth = 0
+        self._deadline = time.time() + self._time_budget
+        previous = None
+        for depth in range(1, self._max_depth + 1):
+            start = time.time()
+            try:
+                best_move = self._search_root(moves, depth)
+            except _SearchTimeout:
+                break
+            self._depth = depth
+            now = time.time()
+            spent = now - start
+            growth = DEPTH_GROWTH
+            if previous:
+                growth = max(growth, spent / previous)
+            if now + spent * growth > self._deadline:
+                break
+            previous = spent
+        return best_move
+
+    def _search_root(self, moves, depth):
+        """
+        Return the direction with the highest expected value at depth.
+        """
+        best_value = None
+        best_move = None
+        for direction, moved in moves:
+            value = self._chance_node(moved, depth - 1, 1.0)
+            if best_value is None or value > best_value:
+                best_value = value
+                best_move = direction
+        return best_move
+
+    def _max_node(self, board, depth, probability):
+        """
+        Value of the best move from board, or 0 if the game is over.
+        """
+        best_value = 0.0
+        for direction in (UP, DOWN, LEFT, RIGHT):
+            moved = move_bitboard(board, direction)
+            if moved != board:
+                value = self._chance_node(moved, depth - 1, probability)
+                if value > best_value:
+                    best_value = value
+        return best_value
+
+    def _chance_node(self, board, depth, probability):
+        """
+        Expected value over all tile spawns on board.
+        """
+        if depth <= 0 or probability < PROBABILITY_CUTOFF:
+            return evaluate_bitboard(board)
+        if time.time() > self._deadline:
+            raise _SearchTimeout()
+        key = (board, depth)
+        table = self._table
+        if key in table:
+            value = table.pop(key)
+            table[key] = value
+            return value
+        shifts = empty_shifts(board)
+        probability /= len(shifts)
+        total = 0.0
+        for shift in shifts:
+            total += 0.9 * self._max_node(board | (1 << shift), depth,
+                                          probability * 0.9)
+            total += 0.1 * self._max_node(board | (2 << shift), depth,
+                                          probability * 0.1)
+        value = total / len(shifts)
+        table[key] = value
+        if len(table) > self._table_size:
+            table.popitem(last=False)
+        return value
+
+# Start the GUI only when run as a script, so the game logic can be
+# imported headless.
+if __name__ == "__main__":
+    import poc_2048_gui
+    poc_2048_gui.run_gui(TwentyFortyEight(4, 4))
@@ -0,0 +1,388 @@
+"""
+Batched 2048 simulator that steps many games at once with NumPy.
+
+The boards are kept flat, one row of H * W tile exponents per game.  A
+move gathers every board's cells in the order of the lines it slides
+along, merges all lines with one lookup in a table that has an entry
+per possible line, spawns the new tiles in that order and scatters the
+cells back.  With 10000 4x4 games this steps over 100 times as many
+moves per second as looping over TwentyFortyEight games.
+"""
+
+import numpy
+
+# Directions, same values as in 2048.py
+UP = 1
+DOWN = 2
+LEFT = 3
+RIGHT = 4
+
+DIRECTIONS = (UP, DOWN, LEFT, RIGHT)
+
+# Tiles are stored as exponents of their values (0 for an empty cell)
+# and saturate at 2 ** MAX_EXPONENT, as on the bitboard in 2048.py.
+MAX_EXPONENT = 15
+
+# Rows at most this long are merged through a precomputed lookup table
+# with one entry per possible row; longer rows use merge_rows().
+MAX_TABLE_LENGTH = 5
+
+# Boards with at most this many cells pick the cell of a new tile after
+# a move from a table indexed by the bit mask of their empty cells.
+MAX_SPAWN_CELLS = 16
+
+_ROW_TABLES = {}
+
+_LINE_TABLES = {}
+
+_BOARD_ORDERS = {}
+
+_SPAWN_TABLES = {}
+
+def _compress(rows):
+    """
+    Slide the non-zero tiles of each row to the front, keeping order.
+    """
+    order = numpy.argsort(rows == 0, axis=1, kind="stable")
+    return numpy.take_along_axis(rows, order, axis=1)
+
+def merge_rows(rows):
+    """
+    Merge every row of a 2D array of tile exponents towards index 0.
+
+    Applies the same rules as merge() in 2048.py to all rows at once and
+    returns a new array.
+    """
+    rows = _compress(rows)
+    for index in range(rows.shape[1] - 1):
+        same = (rows[:, index] == rows[:, index + 1]) & (rows[:, index] != 0)
+        rows[same, index] = numpy.minimum(rows[same, index] + 1, MAX_EXPONENT)
+        rows[same, index + 1] = 0
+    return _compress(rows)
+
+def _row_table(length):
+    """
+    Return the merge table for rows of the given length, building it on
+    first use.  Row i of the table is the merged form of the row whose
+    exponents are the base-16 digits of i.
+    """
+    if length not in _ROW_TABLES:
+        keys = numpy.arange(16 ** length)
+        rows = (keys[:, None] >> (4 * numpy.arange(length))) & 0xF
+        _ROW_TABLES[length] = merge_rows(rows).astype(numpy.uint8)
+    return _ROW_TABLES[length]
+
+def _line_tables(length):
+    """
+    Return (rows, moved, empties) for rows of the given length, indexed
+    like _row_table(): the merged rows, whether merging changes the row,
+    and the bit mask of the empty cells of the merged row.
+    """
+    if length not in _LINE_TABLES:
+        rows = _row_table(length)
+        keys = numpy.arange(16 ** length)
+        merged_keys = (rows.astype(numpy.int64) <<
+                       (4 * numpy.arange(length))).sum(axis=1)
+        empties = ((rows == 0).astype(numpy.int64) <<
+                   numpy.arange(length)).sum(axis=1)
+        _LINE_TABLES[length] = (rows, merged_keys != keys,
+                                empties.astype(numpy.int32))
+    return _LINE_TABLES[length]
+
+def _board_orders(height, width):
+    """
+    Return (orders, inverses) for boards of the given size.  Row
+    direction of orders lists the flat cell indices of a board line by
+    line, each line starting from the cell its tiles move towards, and
+    the same row of inverses undoes that order.  Row 0 is unused.
+    """
+    if (height, width) not in _BOARD_ORDERS:
+        cells = numpy.arange(height * width).reshape(height, width)
+        orders = numpy.zeros((RIGHT + 1, height * width), dtype=numpy.intp)
+        orders[0] = cells.ravel()
+        orders[UP] = cells.T.ravel()
+        orders[DOWN] = cells.T[:, ::-1].ravel()
+        orders[LEFT] = cells.ravel()
+        orders[RIGHT] = cells[:, ::-1].ravel()
+        _BOARD_ORDERS[height, width] = (orders, numpy.argsort(orders, axis=1))
+    return _BOARD_ORDERS[height, width]
+
+def _spawn_tables(size):
+    """
+    Return (counts, cells) for boards of size cells: counts[mask] is the
+    number of bits set in mask, and cells[mask * size + k] the index of
+    its k-th set bit.
+    """
+    if size not in _SPAWN_TABLES:
+        masks = numpy.arange(1 << size)
+        bits = (masks[:, None] >> numpy.arange(size)) & 1
+        cells = numpy.argsort(1 - bits, axis=1, kind="stable")
+        _SPAWN_TABLES[size] = (bits.sum(axis=1).astype(numpy.intp),
+                               cells.astype(numpy.intp).ravel())
+    return _SPAWN_TABLES[size]
+
+def _line_length(direction, height, width):
+    """
+    Return the length of the lines tiles slide along in direction.
+    """
+    if direction in (UP, DOWN):
+        return height
+    return width
+
+def _any_line(flags):
+    """
+    Return which rows of a (n, lines) array have a true entry.  Faster
+    than any(axis=1) for the few lines of a board.
+    """
+    result = flags[:, 0].copy()
+    for line in range(1, flags.shape[1]):
+        result |= flags[:, line]
+    return result
+
+def _merge_lines(lines, length):
+    """
+    Merge a (n, cells) array of boards laid out as lines of the given
+    length, each towards its first cell.  Returns the merged boards, a
+    boolean array telling which boards changed, and the (n, lines) keys
+    of the lines, or None when the lines were merged by merge_rows().
+    """
+    count = len(lines)
+    if length > MAX_TABLE_LENGTH:
+        merged = merge_rows(lines.reshape(-1, length)).reshape(count, -1)
+        return merged, (merged != lines).any(axis=1), None
+    rows, moved, dummy_empties = _line_tables(length)
+    lines = lines.reshape(count, -1, length)
+    keys = lines[:, :, 0].astype(numpy.int32)
+    for index in range(1, length):
+        keys |= lines[:, :, index].astype(numpy.int32) << (4 * index)
+    merged = rows.take(keys, axis=0).reshape(count, -1)
+    return merged, _any_line(moved.take(keys)), keys
+
+def slide_boards(boards, direction):
+    """
+    Return a copy of a (N, H, W) array of tile exponents moved in
+    direction.  No new tiles are added.
+    """
+    count, height, width = boards.shape
+    orders, inverses = _board_orders(height, width)
+    lines = boards.reshape(count, -1)[:, orders[direction]]
+    merged = _merge_lines(lines, _line_length(direction, height, width))[0]
+    return merged[:, inverses[direction]].reshape(boards.shape)
+
+class BatchTwentyFortyEight:
+    """
+    Game logic for many TwentyFortyEight games of the same size.
+
+    The boards are held in one (N, H * W) array of tile exponents, and
+    every operation is applied to all boards with NumPy.
+    """
+    def __init__(self, num_boards, grid_height, grid_width, seed=None):
+        self._num_boards = num_boards
+        self._grid_height = grid_height
+        self._grid_width = grid_width
+        self._rng = numpy.random.RandomState(seed)
+        self._cells = numpy.zeros((num_boards, grid_height * grid_width),
+                                  dtype=numpy.uint8)
+        self.reset()
+
+    def reset(self, mask=None):
+        """
+        Reset the selected games (all by default) so their grids are
+        empty except for two initial tiles.
+        """
+        mask = self._as_mask(mask)
+        self._cells[mask] = 0
+        self.new_tile(mask)
+        self.new_tile(mask)
+
+    def __str__(self):
+        """
+        Return a string representation of the grids for debugging.
+        """
+        return str(self.get_exponents())
+
+    def get_num_boards(self):
+        """
+        Get the number of games in the batch.
+        """
+        return self._num_boards
+
+    def get_grid_height(self):
+        """
+        Get the height of the boards.
+        """
+        return self._grid_height
+
+    def get_grid_width(self):
+        """
+        Get the width of the boards.
+        """
+        return self._grid_width
+
+    def get_cells(self):
+        """
+        Return a (N, H, W) array of tile values.
+        """
+        cells = self.get_exponents().astype(numpy.int64)
+        return numpy.where(cells > 0, 1 << cells, 0)
+
+    def get_exponents(self):
+        """
+        Return the live (N, H, W) array of tile exponents.
+        """
+        return self._cells.reshape(self._num_boards, self._grid_height,
+                                   self._grid_width)
+
+    def _as_mask(self, mask):
+        """
+        Turn None into an all-true mask.
+        """
+        if mask is None:
+            return numpy.ones(self._num_boards, dtype=bool)
+        return numpy.asarray(mask, dtype=bool)
+
+    def move(self, directions, mask=None):
+        """
+        Move the tiles of every selected game in its direction.
+
+        directions is either a single direction or an array holding one
+        direction per game.  Games whose tiles moved get a new tile.
+        Returns a boolean array telling which games changed.
+        """
+        directions = numpy.broadcast_to(numpy.asarray(directions),
+                                        (self._num_boards,))
+        mask = self._as_mask(mask)
+        changed = numpy.zeros(self._num_boards, dtype=bool)
+        if self._grid_height == self._grid_width:
+            groups = (DIRECTIONS,)
+        else:
+            # Rows and columns have different lengths.
+            groups = ((UP, DOWN), (LEFT, RIGHT))
+        for group in groups:
+            indices = [numpy.nonzero(mask & (directions == direction))[0]
+                       for direction in group]
+            boards = numpy.concatenate(indices)
+            if len(boards) > 0:
+                changed[boards] = self._move_boards(group, indices)
+        return changed
+
+    def _move_boards(self, directions, indices):
+        """
+        Move the games in indices[i] in directions[i], for directions
+        whose lines have the same length, and give the games that changed
+        a new tile.  Returns a boolean array telling which of the games,
+        in the order of indices, changed.
+        """
+        size = self._grid_height * self._grid_width
+        length = _line_length(directions[0], self._grid_height,
+                              self._grid_width)
+        orders, inverses = _board_orders(self._grid_height, self._grid_width)
+        merged, moved, keys = _merge_lines(numpy.concatenate(
+            [self._cells.take(boards, axis=0)[:, orders[direction]]
+             for direction, boards in zip(directions, indices)]), length)
+        if keys is not None and size <= MAX_SPAWN_CELLS:
+            # Every board that moved has an empty cell for the new tile.
+            spawned = numpy.nonzero(moved)[0]
+            line_empties = _line_tables(length)[2].take(keys)
+            empties = line_empties[:, 0].copy()
+            for line in range(1, line_empties.shape[1]):
+                empties |= line_empties[:, line] << (line * length)
+            empties = empties[spawned]
+            counts, cells = _spawn_tables(size)
+            picks = (self._rng.random_sample(len(spawned)) *
+                     counts.take(empties)).astype(numpy.intp)
+            merged[spawned, cells.take(empties * size + picks)] = numpy.where(
+                self._rng.random_sample(len(spawned)) < 0.9, 1, 2)
+        start = 0
+        for direction, boards in zip(directions, indices):
+            self._cells[boards] = merged[start:start + len(boards),
+                                         inverses[direction]]
+            start += len(boards)
+        if keys is None or size > MAX_SPAWN_CELLS:
+            spawn = numpy.zeros(self._num_boards, dtype=bool)
+            spawn[numpy.concatenate(indices)[moved]] = True
+            self.new_tile(spawn)
+        return moved
+
+    def can_move(self, direction):
+        """
+        Return a boolean array telling which games would change if
+        moved in direction.
+        """
+        orders = _board_orders(self._grid_height, self._grid_width)[0]
+        return _merge_lines(self._cells[:, orders[direction]],
+                            _line_length(direction, self._grid_height,
+                                         self._grid_width))[1]
+
+    def new_tile(self, mask=None):
+        """
+        Create a new tile in a randomly selected empty square of every
+        selected game that has one.  The tile should be 2 90% of the
+        time and 4 10% of the time.
+        """
+        indices = numpy.nonzero(self._as_mask(mask))[0]
+        empty = self._cells[indices] == 0
+        counts = numpy.count_nonzero(empty, axis=1)
+        if not counts.all():
+            indices = indices[counts > 0]
+            empty = empty[counts > 0]
+            counts = counts[counts > 0]
+        if len(indices) == 0:
+            return
+        picks = (self._rng.random_sample(len(indices)) *
+                 counts).astype(numpy.int64)
+        positions = numpy.argmax(numpy.cumsum(empty, axis=1) >
+                                 picks[:, None], axis=1)
+        values = numpy.where(self._rng.random_sample(len(indices)) < 0.9,
+                             1, 2)
+        self._cells[indices, positions] = values
+
+    def empty_counts(self):
+        """
+        Return the number of empty squares of every game.
+        """
+        return numpy.count_nonzero(self._cells == 0, axis=1)
+
+    def max_tiles(self):
+        """
+        Return the largest tile of every game.
+        """
+        exponents = self._cells.max(axis=1).astype(numpy.int64)
+        return numpy.where(exponents > 0, 1 << exponents, 0)
+
+    def is_game_over(self):
+        """
+        Return a boolean array telling which games have no moves left.
+        """
+        over = numpy.zeros(self._num_boards, dtype=bool)
+        indices = numpy.nonzero(self.empty_counts() == 0)[0]
+        cells = self.get_exponents()[indices]
+        height = self._grid_height
+        width = self._grid_width
+        pairs = ((cells[:, :, 1:] == cells[:, :, :-1])
+                 .reshape(len(indices), height * (width - 1)).any(axis=1) |
+                 (cells[:, 1:, :] == cells[:, :-1, :])
+                 .reshape(len(indices), (height - 1) * width).any(axis=1))
+        over[indices] = ~pairs
+        return over
+
+    def set_tile(self, board, row, col, value):
+        """
+        Set the tile at position row, col of the given game.
+        """
+        exponent = 0
+        while value > 1:
+            value >>= 1
+            exponent += 1
+        self._cells[board, row * self._grid_width + col] = min(exponent,
+                                                               MAX_EXPONENT)
+
+    def get_tile(self, board, row, col):
+        """
+        Return the value of the tile at position row, col of the given
+        game.
+        """
+        exponent = int(self._cells[board, row * self._grid_width + col])
+        if exponent == 0:
+            return 0
+        return 1 << exponent
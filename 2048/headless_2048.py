@@ -0,0 +1,344 @@
+"""
+Headless benchmark and replay harness for the 2048 game logic.
+
+Plays seeded games of TwentyFortyEight with a pluggable policy, reports
+moves per second, the max-tile distribution and a per-phase time
+breakdown, and reads and writes compact binary replay logs.
+
+Usage: python headless_2048.py --games 20 --policy random --replay-dir logs
+"""
+
+import argparse
+import importlib
+import os
+import random
+import struct
+import timeit
+from collections import Counter
+
+# The game module's name starts with a digit, so it has to be imported
+# by name.
+game2048 = importlib.import_module("2048")
+
+DIRECTIONS = (game2048.UP, game2048.DOWN, game2048.LEFT, game2048.RIGHT)
+
+# Replay file layout: a header, the exponents of the initial tiles (one
+# byte per cell, row by row), then two bytes per move.  The first move
+# byte holds the direction in bits 0-1 and a 1 in bit 2 if the spawned
+# tile was a 4; the second byte is the index of the spawned cell.
+REPLAY_MAGIC = b"2048"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sBBBII")
+MOVE_RECORD = struct.Struct("<BB")
+
+PHASES = ("merge", "move", "spawn")
+
+
+def random_policy(game):
+    """
+    Pick a uniformly random direction.
+    """
+    return random.choice(DIRECTIONS)
+
+
+def expectimax_policy(time_budget=game2048.EXPECTIMAX_TIME_BUDGET):
+    """
+    Return a policy that plays with an ExpectimaxPlayer (4x4 only).
+    """
+    player = game2048.ExpectimaxPlayer(time_budget=time_budget)
+    return player.get_move
+
+
+POLICIES = {"random": lambda: random_policy,
+            "expectimax": expectimax_policy}
+
+
+class GameLog:
+    """
+    Record of one game: the starting tiles and every move that changed
+    the board, with the tile it spawned.
+    """
+    def __init__(self, height, width, seed, initial):
+        self._height = height
+        self._width = width
+        self._seed = seed
+        self._initial = initial
+        self._moves = []
+
+    def get_height(self):
+        """
+        Get the height of the board.
+        """
+        return self._height
+
+    def get_width(self):
+        """
+        Get the width of the board.
+        """
+        return self._width
+
+    def get_seed(self):
+        """
+        Get the seed the game was played with.
+        """
+        return self._seed
+
+    def get_initial(self):
+        """
+        Get the initial tile values as a flat row-major list.
+        """
+        return self._initial
+
+    def get_moves(self):
+        """
+        Get the moves as (direction, cell index, tile value) tuples.
+        """
+        return self._moves
+
+    def add_move(self, direction, cell, value):
+        """
+        Append a move and the tile it spawned.
+        """
+        self._moves.append((direction, cell, value))
+
+    def to_bytes(self):
+        """
+        Encode the log in the binary replay format.
+        """
+        parts = [REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION,
+                                    self._height, self._width,
+                                    self._seed & 0xFFFFFFFF,
+                                    len(self._moves))]
+        parts.append(bytearray(game2048.tile_exponent(value)
+                               for value in self._initial))
+        for direction, cell, value in self._moves:
+            flags = (direction - 1) | ((value == 4) << 2)
+            parts.append(MOVE_RECORD.pack(flags, cell))
+        return b"".join(bytes(part) for part in parts)
+
+
+def parse_replay(data):
+    """
+    Decode a GameLog from the binary replay format.
+    """
+    magic, version, height, width, seed, num_moves = \
+        REPLAY_HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ValueError("not a 2048 replay log")
+    offset = REPLAY_HEADER.size
+    exponents = bytearray(data[offset:offset + height * width])
+    offset += height * width
+    log = GameLog(height, width, seed,
+                  [1 << exponent if exponent else 0 for exponent in exponents])
+    for dummy_index in range(num_moves):
+        flags, cell = MOVE_RECORD.unpack_from(data, offset)
+        offset += MOVE_RECORD.size
+        log.add_move((flags & 3) + 1, cell, 4 if flags & 4 else 2)
+    return log
+
+
+def write_replay(path, log):
+    """
+    Write a GameLog to path.
+    """
+    with open(path, "wb") as replay_file:
+        replay_file.write(log.to_bytes())
+
+
+def read_replay(path):
+    """
+    Read a GameLog from path.
+    """
+    with open(path, "rb") as replay_file:
+        return parse_replay(replay_file.read())
+
+
+def replay(log):
+    """
+    Rebuild the final position of a logged game without using the
+    random number generator.  Returns the TwentyFortyEight game.
+    """
+    game = game2048.TwentyFortyEight(log.get_height(), log.get_width())
+    width = log.get_width()
+    for index, value in enumerate(log.get_initial()):
+        game.set_tile(index // width, index % width, value)
+    game.new_tile = lambda: None
+    for direction, cell, value in log.get_moves():
+        if not game.move(direction):
+            raise ValueError("replayed move did not change the board")
+        game.set_tile(cell // width, cell % width, value)
+    del game.new_tile
+    return game
+
+
+class _PhaseTimer:
+    """
+    Accumulates the time spent in merge() and new_tile() while a game
+    runs, by wrapping both for the duration of the game.  Also remembers
+    the last spawned tile as (cell index, value) for the replay log.
+    """
+    def __init__(self):
+        self.totals = dict((phase, 0.0) for phase in PHASES)
+        self.last_spawn = None
+
+    def wrap_merge(self):
+        """
+        Return a timed replacement for game2048.merge.
+        """
+        merge = game2048.merge
+        totals = self.totals
+
+        def timed_merge(line):
+            """
+            merge() that adds its run time to the merge phase.
+            """
+            start = timeit.default_timer()
+            result = merge(line)
+            totals["merge"] += timeit.default_timer() - start
+            return result
+        return timed_merge
+
+    def wrap_new_tile(self, game):
+        """
+        Return a timed replacement for game.new_tile.
+        """
+        new_tile = game.new_tile
+        totals = self.totals
+        width = game.get_grid_width()
+        timer = self
+
+        def timed_new_tile():
+            """
+            new_tile() that adds its run time to the spawn phase and
+            records the new tile.
+            """
+            start = timeit.default_timer()
+            spawned = new_tile()
+            totals["spawn"] += timeit.default_timer() - start
+            if spawned is not None:
+                row, col, value = spawned
+                timer.last_spawn = (row * width + col, value)
+            return spawned
+        return timed_new_tile
+
+
+def play_game(policy, seed, height=4, width=4, max_moves=None, timer=None):
+    """
+    Play one seeded game with policy, a function from a game to a
+    direction.  Returns the final game, its GameLog and the number of
+    moves that changed the board.
+    """
+    random.seed(seed)
+    game = game2048.TwentyFortyEight(height, width)
+    initial = [game.get_tile(row, col)
+               for row in range(height) for col in range(width)]
+    log = GameLog(height, width, seed, initial)
+    if timer is None:
+        timer = _PhaseTimer()
+    game.new_tile = timer.wrap_new_tile(game)
+    original_merge = game2048.merge
+    game2048.merge = timer.wrap_merge()
+    moves = 0
+    try:
+        while not game.is_game_over():
+            if max_moves is not None and moves >= max_moves:
+                break
+            direction = policy(game)
+            if direction is None:
+                break
+            start = timeit.default_timer()
+            changed = game.move(direction)
+            timer.totals["move"] += timeit.default_timer() - start
+            if changed:
+                moves += 1
+                cell, value = timer.last_spawn
+                log.add_move(direction, cell, value)
+    finally:
+        game2048.merge = original_merge
+    del game.new_tile
+    return game, log, moves
+
+
+def run_benchmark(policy, games, seed=0, height=4, width=4,
+                  max_moves=None, replay_dir=None):
+    """
+    Play games seeded seed, seed + 1, ... and return a report dict with
+    the move rate, the max-tile distribution and per-phase seconds.
+    """
+    timer = _PhaseTimer()
+    max_tiles = Counter()
+    total_moves = 0
+    elapsed = 0.0
+    for index in range(games):
+        start = timeit.default_timer()
+        game, log, moves = play_game(policy, seed + index, height, width,
+                                     max_moves, timer)
+        elapsed += timeit.default_timer() - start
+        total_moves += moves
+        max_tiles[max(game.get_tile(row, col) for row in range(height)
+                      for col in range(width))] += 1
+        if replay_dir is not None:
+            write_replay(os.path.join(replay_dir, "game_%d.bin" %
+                                      (seed + index)), log)
+    phases = dict(timer.totals)
+    # merge() runs inside move(), and so does the spawn.
+    phases["move"] -= phases["merge"] + phases["spawn"]
+    return {"games": games,
+            "moves": total_moves,
+            "seconds": elapsed,
+            "moves_per_sec": total_moves / elapsed if elapsed else 0.0,
+            "max_tiles": dict(max_tiles),
+            "phases": phases}
+
+
+def print_report(report):
+    """
+    Print a benchmark report.
+    """
+    print("%d games, %d moves in %.3f s (%.0f moves/sec)" %
+          (report["games"], report["moves"], report["seconds"],
+           report["moves_per_sec"]))
+    print("max tile distribution:")
+    for tile in sorted(report["max_tiles"]):
+        print("  %6d: %d" % (tile, report["max_tiles"][tile]))
+    print("time per phase:")
+    total = sum(report["phases"].values())
+    for phase in PHASES:
+        seconds = report["phases"][phase]
+        print("  %-6s %.3f s (%.1f%%)" %
+              (phase, seconds, 100.0 * seconds / total if total else 0.0))
+
+
+def main():
+    """
+    Run the benchmark, or replay logs, from the command line.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--games", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--height", type=int, default=4)
+    parser.add_argument("--width", type=int, default=4)
+    parser.add_argument("--max-moves", type=int, default=None)
+    parser.add_argument("--policy", choices=sorted(POLICIES),
+                        default="random")
+    parser.add_argument("--replay-dir", default=None,
+                        help="write one replay log per game here")
+    parser.add_argument("--replay", nargs="*", default=[],
+                        help="print the final board of these replay logs")
+    args = parser.parse_args()
+    if args.replay:
+        for path in args.replay:
+            log = read_replay(path)
+            print("%s: seed %d, %d moves" %
+                  (path, log.get_seed(), len(log.get_moves())))
+            print(replay(log))
+        return
+    if args.replay_dir is not None and not os.path.isdir(args.replay_dir):
+        os.makedirs(args.replay_dir)
+    print_report(run_benchmark(POLICIES[args.policy](), args.games,
+                               args.seed, args.height, args.width,
+                               args.max_moves, args.replay_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+Monte Carlo move selection for 2048 with rollouts spread over a
+process pool.
+
+Every legal direction is scored by random playouts from the resulting
+board.  Playouts run in batches; each batch gets its own random number
+generator seeded from (seed, move number, direction, batch number), so
+results only depend on the seed and the number of workers.  After each
+round, directions whose confidence interval lies entirely below the
+best one's stop receiving rollouts.
+
+Usage: python montecarlo_2048.py --workers 4 --rollouts 400
+"""
+
+import argparse
+import importlib
+import math
+import multiprocessing
+import random
+import timeit
+
+game2048 = importlib.import_module("2048")
+
+DIRECTIONS = (game2048.UP, game2048.DOWN, game2048.LEFT, game2048.RIGHT)
+
+SEED_MULTIPLIER = 1000003
+
+
+def rollout(board, rng, max_moves):
+    """
+    Play random moves from a packed board until the game is over or
+    max_moves have been made.  Returns the number of moves made.
+    """
+    directions = list(DIRECTIONS)
+    moves = 0
+    while moves < max_moves:
+        rng.shuffle(directions)
+        for direction in directions:
+            moved = game2048.move_bitboard(board, direction)
+            if moved != board:
+                break
+        else:
+            break
+        shift = rng.choice(game2048.empty_shifts(moved))
+        board = moved | ((1 if rng.random() < 0.9 else 2) << shift)
+        moves += 1
+    return moves
+
+
+def rollout_batch(task):
+    """
+    Run a batch of rollouts.  task is (board, seed, count, max_moves);
+    returns (count, sum of results, sum of squared results).
+    """
+    board, seed, count, max_moves = task
+    game2048.build_row_tables()
+    rng = random.Random(seed)
+    total = 0
+    total_sq = 0
+    for dummy_index in range(count):
+        result = rollout(board, rng, max_moves)
+        total += result
+        total_sq += result * result
+    return count, total, total_sq
+
+
+class _Stats:
+    """
+    Running rollout statistics for one direction.
+    """
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.total_sq = 0
+        self.batches = 0
+
+    def add(self, result):
+        """
+        Add the (count, sum, sum of squares) result of a batch.
+        """
+        self.count += result[0]
+        self.total += result[1]
+        self.total_sq += result[2]
+        self.batches += 1
+
+    def mean(self):
+        """
+        Mean rollout result.
+        """
+        return float(self.total) / self.count
+
+    def half_width(self, z_score):
+        """
+        Half the width of the confidence interval of the mean.
+        """
+        if self.count < 2:
+            return float("inf")
+        mean = self.mean()
+        variance = max(0.0, (self.total_sq - self.count * mean * mean) /
+                       (self.count - 1))
+        return z_score * math.sqrt(variance / self.count)
+
+
+class MonteCarloSelector:
+    """
+    Picks 2048 moves by parallel random rollouts with early stopping.
+
+    rollouts is the maximum number of rollouts per direction, run in
+    batches of batch_size.  z_score sets the width of the confidence
+    intervals used to drop directions that are clearly worse.  With
+    workers=1 everything runs in the calling process.
+    """
+    def __init__(self, rollouts=400, batch_size=25, workers=None, seed=0,
+                 z_score=2.58, max_moves=1000):
+        game2048.build_row_tables()
+        if workers is None:
+            workers = multiprocessing.cpu_count()
+        self._rollouts = rollouts
+        self._batch_size = batch_size
+        self._workers = workers
+        self._seed = seed
+        self._z_score = z_score
+        self._max_moves = max_moves
+        self._move_number = 0
+        self._rollouts_run = 0
+        self._pool = None
+        if workers > 1:
+            self._pool = multiprocessing.Pool(workers)
+
+    def close(self):
+        """
+        Shut down the worker pool.
+        """
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def get_rollouts_run(self):
+        """
+        Return the total number of rollouts run so far.
+        """
+        return self._rollouts_run
+
+    def _batch_seed(self, direction, batch):
+        """
+        Seed of the random stream for one batch of the current move.
+        """
+        seed = self._seed
+        for part in (self._move_number, direction, batch):
+            seed = seed * SEED_MULTIPLIER + part
+        return seed
+
+    def get_move(self, game):
+        """
+        Return the best direction for the current position of game, or
+        None if no direction changes the board.
+        """
+        board = game2048.game_to_bitboard(game)
+        moved = {}
+        for direction in DIRECTIONS:
+            result = game2048.move_bitboard(board, direction)
+            if result != board:
+                moved[direction] = result
+        self._move_number += 1
+        if not moved:
+            return None
+        if len(moved) == 1:
+            return list(moved)[0]
+        stats = dict((direction, _Stats()) for direction in moved)
+        active = sorted(moved)
+        max_batches = max(1, self._rollouts // self._batch_size)
+        while active:
+            per_direction = max(1, self._workers // len(active))
+            tasks = []
+            owners = []
+            for direction in active:
+                first = stats[direction].batches
+                for batch in range(first, min(first + per_direction,
+                                              max_batches)):
+                    tasks.append((moved[direction],
+                                  self._batch_seed(direction, batch),
+                                  self._batch_size, self._max_moves))
+                    owners.append(direction)
+            if not tasks:
+                break
+            if self._pool is None:
+                results = [rollout_batch(task) for task in tasks]
+            else:
+                results = self._pool.map(rollout_batch, tasks)
+            for direction, result in zip(owners, results):
+                stats[direction].add(result)
+                self._rollouts_run += result[0]
+            active = self._prune(active, stats)
+        return max(sorted(stats),
+                   key=lambda direction: stats[direction].mean())
+
+    def _prune(self, active, stats):
+        """
+        Drop directions whose upper confidence bound is below the best
+        lower bound.
+        """
+        if len(active) < 2:
+            return []
+        best_lower = max(stats[direction].mean() -
+                         stats[direction].half_width(self._z_score)
+                         for direction in active)
+        return [direction for direction in active
+                if stats[direction].mean() +
+                stats[direction].half_width(self._z_score) >= best_lower]
+
+
+def main():
+    """
+    Play one game with the selector and report rollout throughput.
+    """
+    parser = argparse.ArgumentParser(
+        description="Play 2048 with parallel Monte Carlo rollouts.")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--rollouts", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=25)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-moves", type=int, default=200,
+                        help="moves to play in the game")
+    args = parser.parse_args()
+    selector = MonteCarloSelector(args.rollouts, args.batch_size,
+                                  args.workers, args.seed)
+    random.seed(args.seed)
+    game = game2048.BitboardTwentyFortyEight()
+    moves = 0
+    start = timeit.default_timer()
+    try:
+        while moves < args.max_moves:
+            direction = selector.get_move(game)
+            if direction is None:
+                break
+            game.move(direction)
+            moves += 1
+    finally:
+        selector.close()
+    elapsed = timeit.default_timer() - start
+    print(game)
+    print("%d moves, %d rollouts in %.2f s (%.0f rollouts/sec)" %
+          (moves, selector.get_rollouts_run(), elapsed,
+           selector.get_rollouts_run() / elapsed))
+
+
+if __name__ == "__main__":
+    main()
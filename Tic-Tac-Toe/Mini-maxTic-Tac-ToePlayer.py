@@ -2,12 +2,26 @@
 Mini-max Tic-Tac-Toe Player
 """
 
-import poc_ttt_gui
-import poc_ttt_provided as provided
+import time
 
-# Set timeout, as mini-max can take a long time
-import codeskulptor
-codeskulptor.set_timeout(60)
+try:
+    import poc_ttt_provided as provided
+
+    # Set timeout, as mini-max can take a long time
+    import codeskulptor
+    codeskulptor.set_timeout(60)
+except ImportError:
+    # Headless, outside CodeSkulptor: ttt_bitboard has the same
+    # constants and switch_player.
+    import ttt_bitboard as provided
+
+try:
+    import os
+    import ttt_book
+except ImportError:
+    # CodeSkulptor has no files or mmap, so the book engine is off.
+    os = None
+    ttt_book = None
 
 # SCORING VALUES - DO NOT MODIFY
 SCORES = {provided.PLAYERX: 1,
@@ -23,8 +37,9 @@ def mm_move(board, player):
     tuple, (row, col).
     """
     # base case
-    if board.check_win() is not None:
-        return SCORES[board.check_win()], (-1, -1)
+    winner = board.check_win()
+    if winner is not None:
+        return SCORES[winner], (-1, -1)
     else:
         scores = [] # an array of scores
         moves = []  # an array of moves
@@ -39,24 +54,298 @@ def mm_move(board, player):
         best_move = moves[max_index]
         return max_score * SCORES[player], best_move
 
+# Transposition table for mm_move_cached, mapping (canonical board,
+# player) to (score, move in canonical orientation).  It is kept between
+# calls, so later moves of a game are answered from earlier searches.
+# It assumes all boards are of the same variant (normal or reverse).
+TRANSPOSITIONS = {}
+
+# For each board size, the 8 rotations and reflections of the board as
+# lists of flat square indices: image[index] = squares[sources[index]].
+_SYMMETRIES = {}
+
+# Index of the inverse of each symmetry in _SYMMETRIES.
+INVERSE_SYMMETRY = [0, 3, 2, 1, 4, 5, 6, 7]
+
+def _transform_square(row, col, symmetry, dim):
+    """
+    Map the square (row, col) through the given symmetry.
+    """
+    last = dim - 1
+    return [(row, col), (col, last - row), (last - row, last - col),
+            (last - col, row), (row, last - col), (last - row, col),
+            (col, row), (last - col, last - row)][symmetry]
+
+def _symmetries(dim):
+    """
+    Return the source index lists of the 8 symmetries of a dim x dim
+    board.
+    """
+    if dim not in _SYMMETRIES:
+        symmetries = []
+        for symmetry in range(8):
+            sources = [0] * (dim * dim)
+            for row in range(dim):
+                for col in range(dim):
+                    new_row, new_col = _transform_square(row, col,
+                                                         symmetry, dim)
+                    sources[new_row * dim + new_col] = row * dim + col
+            symmetries.append(sources)
+        _SYMMETRIES[dim] = symmetries
+    return _SYMMETRIES[dim]
+
+def canonical_form(board):
+    """
+    Return a tuple (key, symmetry), where key is the smallest of the 8
+    rotated and reflected images of board as a flat tuple of squares,
+    and symmetry is the index of the transformation that produced it.
+    """
+    dim = board.get_dim()
+    squares = [board.square(row, col)
+               for row in range(dim) for col in range(dim)]
+    best_key = None
+    best_symmetry = 0
+    for symmetry, sources in enumerate(_symmetries(dim)):
+        key = tuple([squares[index] for index in sources])
+        if best_key is None or key < best_key:
+            best_key = key
+            best_symmetry = symmetry
+    return best_key, best_symmetry
+
+def mm_move_cached(board, player):
+    """
+    Make a move on the board, like mm_move, but look positions up in
+    TRANSPOSITIONS first.  Boards that are rotations or reflections of
+    each other share one entry, and the stored move is mapped back to
+    the orientation of board.
+    """
+    winner = board.check_win()
+    if winner is not None:
+        return SCORES[winner], (-1, -1)
+    dim = board.get_dim()
+    key, symmetry = canonical_form(board)
+    if (key, player) in TRANSPOSITIONS:
+        score, move = TRANSPOSITIONS[(key, player)]
+        return score, _transform_square(move[0], move[1],
+                                        INVERSE_SYMMETRY[symmetry], dim)
+    sign = SCORES[player]
+    best_score = None
+    best_move = None
+    for empty in board.get_empty_squares():
+        board_clone = board.clone()
+        board_clone.move(empty[0], empty[1], player)
+        score, dummy_next_move = mm_move_cached(
+            board_clone, provided.switch_player(player))
+        if best_score is None or score * sign > best_score * sign:
+            best_score = score
+            best_move = empty
+            if score * sign == 1:
+                # nothing beats a win
+                break
+    TRANSPOSITIONS[(key, player)] = (
+        best_score,
+        _transform_square(best_move[0], best_move[1], symmetry, dim))
+    return best_score, best_move
+
+# Alpha-beta search settings.  A depth of None searches to the end of
+# the game; the time budget (in seconds) bounds iterative deepening.
+AB_MAX_DEPTH = None
+AB_TIME_BUDGET = 2.0
+
+# Lines (rows, columns and diagonals) of each board size, as lists of
+# squares.
+_LINES = {}
+
+def _lines(dim):
+    """
+    Return all lines of a dim x dim board.
+    """
+    if dim not in _LINES:
+        lines = [[(row, col) for col in range(dim)] for row in range(dim)]
+        lines.extend([[(row, col) for row in range(dim)]
+                      for col in range(dim)])
+        lines.append([(idx, idx) for idx in range(dim)])
+        lines.append([(idx, dim - 1 - idx) for idx in range(dim)])
+        _LINES[dim] = lines
+    return _LINES[dim]
+
+def evaluate(board):
+    """
+    Heuristic score of an unfinished board, strictly between -1 and 1,
+    from the point of view of PLAYERX like SCORES.  Every line that
+    holds marks of only one player counts for that player, weighted by
+    the number of marks in it.
+    """
+    dim = board.get_dim()
+    lines = _lines(dim)
+    total = 0.0
+    for line in lines:
+        x_marks = 0
+        o_marks = 0
+        for row, col in line:
+            square = board.square(row, col)
+            if square == provided.PLAYERX:
+                x_marks += 1
+            elif square == provided.PLAYERO:
+                o_marks += 1
+        if o_marks == 0 and x_marks > 0:
+            total += 4 ** x_marks
+        elif x_marks == 0 and o_marks > 0:
+            total -= 4 ** o_marks
+    return total / (len(lines) * 4 ** dim)
+
+class _SearchTimeout(Exception):
+    """
+    Raised inside alpha-beta search when the time budget runs out.
+    """
+    pass
+
+def _ordered_moves(board, first_moves):
+    """
+    Return the empty squares of board, center first, with any of
+    first_moves (previous best and killer moves) moved to the front.
+    """
+    center = (board.get_dim() - 1) / 2.0
+    moves = sorted(board.get_empty_squares(),
+                   key=lambda move: (abs(move[0] - center) +
+                                     abs(move[1] - center)))
+    for move in reversed(first_moves):
+        if move in moves:
+            moves.remove(move)
+            moves.insert(0, move)
+    return moves
+
+def _alphabeta(board, player, depth, alpha, beta, search):
+    """
+    Depth-limited alpha-beta search.  search is a dict holding the
+    deadline, the killer move of each remaining depth and the move to
+    try first at the root.  Returns (score, move) like mm_move.
+    """
+    winner = board.check_win()
+    if winner is not None:
+        return SCORES[winner], (-1, -1)
+    if depth == 0:
+        return evaluate(board), (-1, -1)
+    if search["deadline"] is not None and time.time() > search["deadline"]:
+        raise _SearchTimeout()
+    first_moves = [search["killers"].get(depth)]
+    if search["root_depth"] == depth:
+        first_moves.insert(0, search["root_move"])
+    sign = SCORES[player]
+    best_score = None
+    best_move = None
+    for move in _ordered_moves(board, first_moves):
+        board_clone = board.clone()
+        board_clone.move(move[0], move[1], player)
+        score, dummy_next_move = _alphabeta(
+            board_clone, provided.switch_player(player), depth - 1,
+            alpha, beta, search)
+        if best_score is None or score * sign > best_score * sign:
+            best_score = score
+            best_move = move
+        if player == provided.PLAYERX:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        if alpha >= beta:
+            search["killers"][depth] = move
+            break
+    return best_score, best_move
+
+def ab_move(board, player, max_depth=AB_MAX_DEPTH,
+            time_budget=AB_TIME_BUDGET):
+    """
+    Make a move on the board using alpha-beta search.
+
+    Returns (score, (row, col)) like mm_move.  The search deepens one
+    ply at a time until it reaches max_depth (None for the end of the
+    game), finds a forced result, or runs out of time_budget seconds
+    (None for no limit); the move of the deepest finished search is
+    returned.  Below the end of the game, positions are scored with
+    evaluate().
+    """
+    winner = board.check_win()
+    if winner is not None:
+        return SCORES[winner], (-1, -1)
+    empties = len(board.get_empty_squares())
+    if max_depth is None or max_depth > empties:
+        max_depth = empties
+    search = {"deadline": None, "killers": {}, "root_depth": None,
+              "root_move": None}
+    if time_budget is not None:
+        search["deadline"] = time.time() + time_budget
+    result = (evaluate(board), _ordered_moves(board, [])[0])
+    for depth in range(1, max_depth + 1):
+        search["root_depth"] = depth
+        search["root_move"] = result[1]
+        try:
+            result = _alphabeta(board, player, depth, -1, 1, search)
+        except _SearchTimeout:
+            break
+        if result[0] in (-1, 1):
+            break
+    return result
+
+# Opening book of the book engine, next to this file.  Build it with
+#   python ttt_book.py --dim 3 --plies 9 --output ttt_book3.bin
+# Like TRANSPOSITIONS, it assumes all boards are of the same variant
+# (normal or reverse).
+if ttt_book is not None:
+    BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "ttt_book3.bin")
+else:
+    BOOK_PATH = None
+
+# The open OpeningBook, once book_move has loaded it.
+_BOOK = {}
+
+def book_move(board, player):
+    """
+    Make a move on the board from the opening book, a lookup in O(1),
+    and fall back to ab_move for positions that are not in the book.
+
+    Returns (score, (row, col)) like mm_move.  Without the book file,
+    or in CodeSkulptor, every move comes from ab_move.
+    """
+    if "book" not in _BOOK:
+        if BOOK_PATH is None or not os.path.exists(BOOK_PATH):
+            return ab_move(board, player)
+        _BOOK["book"] = ttt_book.OpeningBook(BOOK_PATH)
+    entry = _BOOK["book"].lookup(board, player)
+    if entry is not None:
+        return entry
+    return ab_move(board, player)
+
+# Engines move_wrapper can use, and the one it uses.
+ENGINES = {"minimax": mm_move,
+           "cached": mm_move_cached,
+           "alphabeta": ab_move,
+           "book": book_move}
+ENGINE = "cached"
+
 def move_wrapper(board, player, trials):
     """
     Wrapper to allow the use of the same infrastructure that was used
-    for Monte Carlo Tic-Tac-Toe.
+    for Monte Carlo Tic-Tac-Toe.  Uses the engine named by ENGINE.
     """
-    move = mm_move(board, player)
+    move = ENGINES[ENGINE](board, player)
     assert move[1] != (-1, -1), "returned illegal move (-1, -1)"
     return move[1]
 
 # Test game with the console or the GUI.
 # Uncomment whichever you prefer.
 # Both should be commented out when you submit for
-# testing to save time.
-
-#provided.play_game(move_wrapper, 1, False)        
-poc_ttt_gui.run_gui(3, provided.PLAYERO, move_wrapper, 1, False)
+# testing to save time.  The GUI only runs when this file is the main
+# program, so the engines can be imported headless.
+if __name__ == "__main__":
+    import poc_ttt_gui
 
+    #provided.play_game(move_wrapper, 1, False)
+    poc_ttt_gui.run_gui(3, provided.PLAYERO, move_wrapper, 1, False)
 
-#start with a partially full board.
-print provided.TTTBoard(3, False, [[provided.PLAYERX, provided.PLAYERX, provided.PLAYERO], [provided.EMPTY, provided.PLAYERX, provided.PLAYERX], [provided.PLAYERO, provided.EMPTY, provided.PLAYERO]]), 
-print mm_move(provided.TTTBoard(3, False, [[provided.PLAYERX, provided.PLAYERX, provided.PLAYERO], [provided.EMPTY, provided.PLAYERX, provided.PLAYERX], [provided.PLAYERO, provided.EMPTY, provided.PLAYERO]]), provided.PLAYERO)
+    #start with a partially full board.
+    START = [[provided.PLAYERX, provided.PLAYERX, provided.PLAYERO],
+             [provided.EMPTY, provided.PLAYERX, provided.PLAYERX],
+             [provided.PLAYERO, provided.EMPTY, provided.PLAYERO]]
+    print(provided.TTTBoard(3, False, START))
+    print(mm_move(provided.TTTBoard(3, False, START), provided.PLAYERO))
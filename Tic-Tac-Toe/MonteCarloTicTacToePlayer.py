@@ -3,8 +3,13 @@ Monte Carlo Tic-Tac-Toe Player
 """
 
 import random
-import poc_ttt_gui
-import poc_ttt_provided as provided
+
+try:
+    import poc_ttt_provided as provided
+except ImportError:
+    # Headless, outside CodeSkulptor: ttt_bitboard has the same
+    # constants and switch_player.
+    import ttt_bitboard as provided
 
 # Constants for Monte Carlo simulator
 # You may change the values of these constants as desired, but
@@ -23,14 +28,10 @@ def mc_trial(board, player):
     # so the function does not return anything.
     """
     while board.check_win() == None:
-        print board
         empty_squares = board.get_empty_squares()
         row_col = random.choice(empty_squares)
-        print row_col
         board.move(row_col[0], row_col[1], player)
-        player = provided.switch_player(player)    
-    print board
-    print board.check_win()
+        player = provided.switch_player(player)
 
 def mc_update_scores(scores, board, player):
     """
@@ -53,7 +54,6 @@ def mc_update_scores(scores, board, player):
     
     current_player = player
     other_player = provided.switch_player(current_player)
-    print scores    
     if board.check_win() == current_player:
         for row in range(board.get_dim()):
             for col in range(board.get_dim()):
@@ -68,8 +68,6 @@ def mc_update_scores(scores, board, player):
                     scores[row][col] -= SCORE_CURRENT
                 elif other_player == board.square(row, col):
                     scores[row][col] += SCORE_OTHER
-    print board
-    print scores
     
 
 def get_best_move(board, scores):
@@ -82,22 +80,17 @@ def get_best_move(board, scores):
     # The case where the board is full will not be tested.
     """
     empty_squares = board.get_empty_squares()
-    print empty_squares
     max_val = None
     for row_col in empty_squares:        
         value = scores[row_col[0]][row_col[1]]
-        print row_col
-        print value
         if max_val is None or value > max_val:
             max_indices = [row_col]
             max_val = value
         elif value == max_val:
             max_indices.append(row_col)
-    print max_val, max_indices
-    print random.choice(max_indices)
     return random.choice(max_indices)
 
-def mc_move(board, player, trials):    
+def mc_move(board, player, trials, log=None):
     """
     This function takes a current board, which player the machine player is, 
     # and the number of trials to run. 
@@ -111,20 +104,27 @@ def mc_move(board, player, trials):
     # C. Score the resulting board. 
     # D. Add the scores from 2C to the running total of all scores.
     # To select a move, randomly choose one of the empty squares on the board that has the maximum score.
+
+    log, if given, is called with the board, the score grid and the
+    chosen move, as in ttt_montecarlo.mc_move.
     """
     scores = [[0 for dummy_col in range(board.get_dim())]
                            for dummy_row in range(board.get_dim())]
-    print scores
     for dummy_round in range(trials):
         board_round = board.clone()
         mc_trial(board_round, player)
         mc_update_scores(scores, board_round, player)
-    print get_best_move(board, scores)
-    return get_best_move(board, scores)
+    move = get_best_move(board, scores)
+    if log is not None:
+        log(board, scores, move)
+    return move
 
 # Test game with the console or the GUI.  Uncomment whichever 
 # you prefer.  Both should be commented out when you submit 
-# for testing to save time.
+# for testing to save time.  The GUI only runs when this file is the
+# main program, so mc_move can be imported headless.
+if __name__ == "__main__":
+    import poc_ttt_gui
 
-#provided.play_game(mc_move, NTRIALS, False)        
-poc_ttt_gui.run_gui(3, provided.PLAYERX, mc_move, NTRIALS, False)
+    #provided.play_game(mc_move, NTRIALS, False)
+    poc_ttt_gui.run_gui(3, provided.PLAYERX, mc_move, NTRIALS, False)
@@ -0,0 +1,279 @@
+"""
+Bitmask Tic-Tac-Toe board.
+
+TTTBitBoard has the same interface as TTTBoard from poc_ttt_provided,
+so mm_move, mc_trial and the other players can use it in place of the
+provided board.  Each player's marks are kept as an integer bitmask,
+with square (row, col) at bit row * dim + col.
+"""
+
+try:
+    import poc_ttt_provided as provided
+    EMPTY = provided.EMPTY
+    PLAYERX = provided.PLAYERX
+    PLAYERO = provided.PLAYERO
+    DRAW = provided.DRAW
+except ImportError:
+    # Same values as poc_ttt_provided, for use outside CodeSkulptor.
+    EMPTY = 1
+    PLAYERX = 2
+    PLAYERO = 3
+    DRAW = 4
+
+STRMAP = {EMPTY: " ", PLAYERX: "X", PLAYERO: "O"}
+
+# SCORING VALUES - DO NOT MODIFY
+# Scores of finished games, from the point of view of PLAYERX.
+SCORES = {PLAYERX: 1,
+          DRAW: 0,
+          PLAYERO: -1}
+
+# Lines (rows, columns and diagonals) of each board size, as lists of
+# squares.
+_LINES = {}
+
+# Bitmasks of all rows, columns and diagonals, per board size.
+_LINE_MASKS = {}
+
+# Byte lookup tables that apply each of the 8 board symmetries to a
+# bitmask, per board size.
+_SYMMETRY_TABLES = {}
+
+# Index of the inverse of each symmetry used by transform_square.
+INVERSE_SYMMETRY = [0, 3, 2, 1, 4, 5, 6, 7]
+
+
+def switch_player(player):
+    """
+    Convenience function to switch players.
+    """
+    if player == PLAYERX:
+        return PLAYERO
+    return PLAYERX
+
+
+def board_lines(dim):
+    """
+    Return every winning line of a dim x dim board as a list of (row,
+    col) squares.
+    """
+    if dim not in _LINES:
+        lines = [[(row, col) for col in range(dim)] for row in range(dim)]
+        lines.extend([[(row, col) for row in range(dim)]
+                      for col in range(dim)])
+        lines.append([(idx, idx) for idx in range(dim)])
+        lines.append([(idx, dim - 1 - idx) for idx in range(dim)])
+        _LINES[dim] = lines
+    return _LINES[dim]
+
+
+def line_masks(dim):
+    """
+    Return the bitmasks of every winning line of a dim x dim board.
+    """
+    if dim not in _LINE_MASKS:
+        masks = []
+        for line in board_lines(dim):
+            mask = 0
+            for row, col in line:
+                mask |= 1 << (row * dim + col)
+            masks.append(mask)
+        _LINE_MASKS[dim] = masks
+    return _LINE_MASKS[dim]
+
+
+def transform_square(row, col, symmetry, dim):
+    """
+    Map the square (row, col) through one of the 8 rotations and
+    reflections of a dim x dim board, numbered 0 to 7.
+    """
+    last = dim - 1
+    return [(row, col), (col, last - row), (last - row, last - col),
+            (last - col, row), (row, last - col), (last - row, col),
+            (col, row), (last - col, last - row)][symmetry]
+
+
+def _symmetry_tables(dim):
+    """
+    Return, for each symmetry, one 256-entry table per byte of a mask
+    giving the transformed bits of that byte.
+    """
+    if dim not in _SYMMETRY_TABLES:
+        num_bytes = (dim * dim + 7) // 8
+        all_tables = []
+        for symmetry in range(8):
+            targets = []
+            for index in range(dim * dim):
+                row, col = transform_square(index // dim, index % dim,
+                                            symmetry, dim)
+                targets.append(row * dim + col)
+            tables = []
+            for byte in range(num_bytes):
+                table = []
+                for value in range(256):
+                    image = 0
+                    for bit in range(8):
+                        index = 8 * byte + bit
+                        if value >> bit & 1 and index < dim * dim:
+                            image |= 1 << targets[index]
+                    table.append(image)
+                tables.append(table)
+            all_tables.append(tables)
+        _SYMMETRY_TABLES[dim] = all_tables
+    return _SYMMETRY_TABLES[dim]
+
+
+def transform_mask(mask, symmetry, dim):
+    """
+    Apply a symmetry to a bitmask of squares.
+    """
+    image = 0
+    for table in _symmetry_tables(dim)[symmetry]:
+        image |= table[mask & 0xFF]
+        mask >>= 8
+    return image
+
+
+def canonical_state(state, dim):
+    """
+    Return (canonical state, symmetry) for a (PLAYERX bits, PLAYERO
+    bits) state: the smallest of its 8 symmetric images, and the index
+    of the symmetry that produces it.
+    """
+    x_bits, o_bits = state
+    best = None
+    best_symmetry = 0
+    for symmetry in range(8):
+        image = (transform_mask(x_bits, symmetry, dim),
+                 transform_mask(o_bits, symmetry, dim))
+        if best is None or image < best:
+            best = image
+            best_symmetry = symmetry
+    return best, best_symmetry
+
+
+class TTTBitBoard:
+    """
+    Tic-Tac-Toe board that stores each player as a bitmask.
+    """
+    def __init__(self, dim, reverse=False, board=None):
+        """
+        Create a dim x dim board.  reverse selects the variant where
+        completing a line loses.  board optionally gives the initial
+        squares as a list of lists.
+        """
+        self._dim = dim
+        self._reverse = reverse
+        self._full = (1 << (dim * dim)) - 1
+        self._lines = line_masks(dim)
+        self._state = (0, 0)
+        if board is not None:
+            for row in range(dim):
+                for col in range(dim):
+                    if board[row][col] != EMPTY:
+                        self.move(row, col, board[row][col])
+
+    def __str__(self):
+        """
+        Human readable representation of the board.
+        """
+        rows = []
+        for row in range(self._dim):
+            rows.append(" | ".join([STRMAP[self.square(row, col)]
+                                    for col in range(self._dim)]))
+        return ("\n" + "-" * (4 * self._dim - 3) + "\n").join(rows) + "\n"
+
+    def get_dim(self):
+        """
+        Return the dimension of the board.
+        """
+        return self._dim
+
+    def get_state(self):
+        """
+        Return the board contents as a (PLAYERX bits, PLAYERO bits)
+        tuple.
+        """
+        return self._state
+
+    def square(self, row, col):
+        """
+        Return the status (EMPTY, PLAYERX, PLAYERO) of the square at
+        position (row, col).
+        """
+        bit = 1 << (row * self._dim + col)
+        if self._state[0] & bit:
+            return PLAYERX
+        if self._state[1] & bit:
+            return PLAYERO
+        return EMPTY
+
+    def get_empty_squares(self):
+        """
+        Return a list of (row, col) tuples for all empty squares.
+        """
+        dim = self._dim
+        empty = self._full & ~(self._state[0] | self._state[1])
+        squares = []
+        while empty:
+            low = empty & -empty
+            index = low.bit_length() - 1
+            squares.append((index // dim, index % dim))
+            empty ^= low
+        return squares
+
+    def move(self, row, col, player):
+        """
+        Place player on the board at position (row, col).  Does nothing
+        if the square is not empty.
+        """
+        bit = 1 << (row * self._dim + col)
+        x_bits, o_bits = self._state
+        if (x_bits | o_bits) & bit:
+            return
+        if player == PLAYERX:
+            self._state = (x_bits | bit, o_bits)
+        else:
+            self._state = (x_bits, o_bits | bit)
+
+    def check_win(self):
+        """
+        Return PLAYERX or PLAYERO if that player has won, DRAW if the
+        board is full with no winner, and None if the game is still in
+        progress.
+        """
+        x_bits, o_bits = self._state
+        winner = None
+        for mask in self._lines:
+            if x_bits & mask == mask:
+                winner = PLAYERX
+                break
+            if o_bits & mask == mask:
+                winner = PLAYERO
+                break
+        if winner is not None:
+            if self._reverse:
+                return switch_player(winner)
+            return winner
+        if x_bits | o_bits == self._full:
+            return DRAW
+        return None
+
+    def clone(self):
+        """
+        Return a copy of the board.
+        """
+        board = self.__class__(self._dim, self._reverse)
+        board._state = self._state
+        return board
+
+
+def from_board(board, reverse=False):
+    """
+    Return a TTTBitBoard with the same squares as board, which can be
+    any object with the TTTBoard interface.
+    """
+    dim = board.get_dim()
+    return TTTBitBoard(dim, reverse,
+                       [[board.square(row, col) for col in range(dim)]
+                        for row in range(dim)])
@@ -0,0 +1,344 @@
+"""
+Perfect-play opening book for Tic-Tac-Toe.
+
+build_book solves every position of the first plies of the game with
+alpha-beta search, merging positions that are rotations or reflections
+of each other, and write_book stores the results as a hash table in a
+flat file.  OpeningBook memory-maps that file and answers lookups in
+O(1) without loading it.  The "book" engine of the minimax player looks
+moves up there before it falls back to ab_move, and with_book does the
+same for any move function.
+
+Usage: python ttt_book.py --dim 3 --plies 9 --output ttt_book3.bin
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import tempfile
+
+from ttt_bitboard import (EMPTY, PLAYERX, PLAYERO, DRAW, SCORES,
+                          INVERSE_SYMMETRY, TTTBitBoard, canonical_state,
+                          from_board, line_masks, switch_player,
+                          transform_square)
+
+# File layout: a header (magic, version, dim, plies, reverse, first
+# player, number of positions, log2 of the number of slots), then the
+# slots, each a position key, the best move as a square index in the
+# canonical orientation, and its score.  Unused slots hold EMPTY_KEY.
+BOOK_MAGIC = b"TTTB"
+BOOK_VERSION = 1
+BOOK_HEADER = struct.Struct("<4sBBBBBII")
+BOOK_SLOT = struct.Struct("<QBb")
+EMPTY_KEY = (1 << 64) - 1
+HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def _set_default_mode(path):
+    """
+    Make path readable like any file open() creates (0666 less the
+    umask) instead of the owner-only 0600 of mkstemp.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+def position_key(state, player, dim):
+    """
+    Pack a (PLAYERX bits, PLAYERO bits) state and the player to move
+    into a 64-bit key (boards up to 5x5).
+    """
+    x_bits, o_bits = state
+    return ((x_bits << (dim * dim) | o_bits) << 1) | (player == PLAYERO)
+
+
+def _slot_index(key, bits):
+    """
+    Home slot of key in a table of 2 ** bits slots.
+    """
+    return ((key * HASH_MULTIPLIER) & EMPTY_KEY) >> (64 - bits)
+
+
+class _Solver:
+    """
+    Alpha-beta solver over bitmask positions with a transposition table
+    of (lower bound, upper bound) pairs keyed on canonical positions.
+    Scores are from the point of view of PLAYERX, as in SCORES.
+    """
+    def __init__(self, dim, reverse=False):
+        self._dim = dim
+        self._reverse = reverse
+        self._lines = line_masks(dim)
+        self._full = (1 << (dim * dim)) - 1
+        center = (dim - 1) / 2.0
+        self._order = sorted(range(dim * dim),
+                             key=lambda index: (abs(index // dim - center) +
+                                                abs(index % dim - center)))
+        self._table = {}
+
+    def result(self, state):
+        """
+        Return the result of check_win() for a state.
+        """
+        x_bits, o_bits = state
+        for mask in self._lines:
+            if x_bits & mask == mask:
+                return PLAYERO if self._reverse else PLAYERX
+            if o_bits & mask == mask:
+                return PLAYERX if self._reverse else PLAYERO
+        if x_bits | o_bits == self._full:
+            return DRAW
+        return None
+
+    def moves(self, state):
+        """
+        Return the empty square indices of a state, center first.
+        """
+        taken = state[0] | state[1]
+        return [index for index in self._order if not taken >> index & 1]
+
+    def play(self, state, index, player):
+        """
+        Return state with player's mark added at square index.
+        """
+        if player == PLAYERX:
+            return (state[0] | 1 << index, state[1])
+        return (state[0], state[1] | 1 << index)
+
+    def solve(self, state, player, alpha=-1, beta=1):
+        """
+        Return the minimax score of state with player to move.
+        """
+        winner = self.result(state)
+        if winner is not None:
+            return SCORES[winner]
+        canonical, dummy_symmetry = canonical_state(state, self._dim)
+        key = (canonical, player)
+        lower, upper = self._table.get(key, (-1, 1))
+        if lower >= beta or lower == upper:
+            return lower
+        if upper <= alpha:
+            return upper
+        alpha = max(alpha, lower)
+        beta = min(beta, upper)
+        first_alpha, first_beta = alpha, beta
+        sign = SCORES[player]
+        best = None
+        for index in self.moves(state):
+            score = self.solve(self.play(state, index, player),
+                               switch_player(player), alpha, beta)
+            if best is None or score * sign > best * sign:
+                best = score
+            if player == PLAYERX:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if alpha >= beta:
+                break
+        if best <= first_alpha:
+            upper = best
+        elif best >= first_beta:
+            lower = best
+        else:
+            lower = upper = best
+        self._table[key] = (lower, upper)
+        return best
+
+    def best_move(self, state, player):
+        """
+        Return (score, square index) of the best move from state.
+        """
+        sign = SCORES[player]
+        best = None
+        for index in self.moves(state):
+            score = self.solve(self.play(state, index, player),
+                               switch_player(player))
+            if best is None or score * sign > best[0] * sign:
+                best = (score, index)
+        return best
+
+
+def _state_board(state, dim, reverse=False):
+    """
+    Return a TTTBitBoard holding a (PLAYERX bits, PLAYERO bits) state.
+    """
+    x_bits, o_bits = state
+    squares = []
+    for row in range(dim):
+        squares.append([])
+        for col in range(dim):
+            bit = 1 << (row * dim + col)
+            if x_bits & bit:
+                squares[-1].append(PLAYERX)
+            elif o_bits & bit:
+                squares[-1].append(PLAYERO)
+            else:
+                squares[-1].append(EMPTY)
+    return TTTBitBoard(dim, reverse, squares)
+
+
+def build_book(dim, plies, reverse=False, first=PLAYERX, search=None):
+    """
+    Solve every position with fewer than plies marks that can arise
+    when first moves first.  Returns a dict from position key (of the
+    canonical orientation) to (square index, score).
+
+    Positions are solved by alpha-beta search, unless search, a
+    (board, player) -> (score, (row, col)) function like mm_move, is
+    given to solve them instead.
+    """
+    solver = _Solver(dim, reverse)
+    book = {}
+    frontier = [canonical_state((0, 0), dim)[0]]
+    player = first
+    for dummy_ply in range(plies):
+        next_frontier = set()
+        for state in frontier:
+            if solver.result(state) is not None:
+                continue
+            if search is None:
+                score, index = solver.best_move(state, player)
+            else:
+                score, (row, col) = search(
+                    _state_board(state, dim, reverse), player)
+                index = row * dim + col
+            book[position_key(state, player, dim)] = (index, score)
+            for move in solver.moves(state):
+                child = solver.play(state, move, player)
+                next_frontier.add(canonical_state(child, dim)[0])
+        frontier = sorted(next_frontier)
+        player = switch_player(player)
+    return book
+
+
+def write_book(path, book, dim, plies, reverse=False, first=PLAYERX):
+    """
+    Write a book from build_book to path as an open-addressing hash
+    table, through a temporary file so readers never see a partial
+    book.
+    """
+    bits = 3
+    while (1 << bits) < 2 * len(book):
+        bits += 1
+    slots = [None] * (1 << bits)
+    for key in sorted(book):
+        slot = _slot_index(key, bits)
+        while slots[slot] is not None:
+            slot = (slot + 1) & ((1 << bits) - 1)
+        slots[slot] = key
+    directory = os.path.dirname(os.path.abspath(path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as book_file:
+            book_file.write(BOOK_HEADER.pack(BOOK_MAGIC, BOOK_VERSION, dim,
+                                             plies, int(reverse), first,
+                                             len(book), bits))
+            for key in slots:
+                if key is None:
+                    book_file.write(BOOK_SLOT.pack(EMPTY_KEY, 0, 0))
+                else:
+                    index, score = book[key]
+                    book_file.write(BOOK_SLOT.pack(key, index, score))
+        _set_default_mode(temp_path)
+        _replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+class OpeningBook:
+    """
+    Read-only, memory-mapped view of a book file.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as book_file:
+            self._map = mmap.mmap(book_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        (magic, version, self._dim, self._plies, reverse, self._first,
+         self._size, self._bits) = BOOK_HEADER.unpack_from(self._map, 0)
+        if magic != BOOK_MAGIC or version != BOOK_VERSION:
+            raise ValueError("not a Tic-Tac-Toe opening book")
+        self._reverse = bool(reverse)
+
+    def __len__(self):
+        """
+        Return the number of positions in the book.
+        """
+        return self._size
+
+    def get_dim(self):
+        """
+        Return the board size the book was built for.
+        """
+        return self._dim
+
+    def close(self):
+        """
+        Unmap the book file.
+        """
+        self._map.close()
+
+    def lookup(self, board, player):
+        """
+        Return (score, (row, col)) for player to move on board, like
+        mm_move, or None if the position is not in the book.
+        """
+        dim = board.get_dim()
+        if dim != self._dim:
+            return None
+        state, symmetry = canonical_state(from_board(board).get_state(), dim)
+        key = position_key(state, player, dim)
+        mask = (1 << self._bits) - 1
+        slot = _slot_index(key, self._bits)
+        while True:
+            stored, index, score = BOOK_SLOT.unpack_from(
+                self._map, BOOK_HEADER.size + slot * BOOK_SLOT.size)
+            if stored == key:
+                move = transform_square(index // dim, index % dim,
+                                        INVERSE_SYMMETRY[symmetry], dim)
+                return score, move
+            if stored == EMPTY_KEY:
+                return None
+            slot = (slot + 1) & mask
+
+
+def with_book(book, fallback):
+    """
+    Return a move function with the (board, player, trials) signature
+    that plays book moves while it can and calls fallback otherwise.
+    """
+    def book_move(board, player, trials):
+        """
+        Play the book move for board, or the fallback's move.
+        """
+        entry = book.lookup(board, player)
+        if entry is not None:
+            return entry[1]
+        return fallback(board, player, trials)
+    return book_move
+
+
+def main():
+    """
+    Build a book file from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Build a Tic-Tac-Toe opening book.")
+    parser.add_argument("--dim", type=int, default=3)
+    parser.add_argument("--plies", type=int, default=9)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--first", choices=("X", "O"), default="X")
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+    first = PLAYERX if args.first == "X" else PLAYERO
+    book = build_book(args.dim, args.plies, args.reverse, first)
+    write_book(args.output, book, args.dim, args.plies, args.reverse, first)
+    print("wrote %d positions to %s" % (len(book), args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+Monte Carlo Tree Search (UCT) Tic-Tac-Toe player.
+
+mcts_move has the same (board, player, trials) signature as mc_move, so
+it can be passed to poc_ttt_gui.run_gui or provided.play_game.  Instead
+of spreading trials evenly over the next moves, it grows a search tree
+towards the promising ones, and keeps the tree between calls: the next
+search starts from the node of the opponent's actual reply.
+"""
+
+import math
+import random
+import time
+
+from ttt_bitboard import DRAW, switch_player
+
+# Exploration constant of the UCT formula.
+UCT_CONSTANT = math.sqrt(2)
+
+# Seconds to search per move in mcts_move, or None to run exactly
+# trials iterations.
+TIME_BUDGET = None
+
+
+def _board_key(board):
+    """
+    Return a hashable snapshot of the squares of board.
+    """
+    if hasattr(board, "get_state"):
+        return board.get_state()
+    dim = board.get_dim()
+    return tuple([board.square(row, col)
+                  for row in range(dim) for col in range(dim)])
+
+
+class _Node:
+    """
+    Search tree node: a position, the player to move, and the results
+    of the playouts through it, counted for the player who moved into
+    it.
+    """
+    def __init__(self, board, player, parent=None, move=None):
+        self.board = board
+        self.player = player
+        self.parent = parent
+        self.move = move
+        self.key = _board_key(board)
+        self.result = board.check_win()
+        self.children = {}
+        if self.result is None:
+            self.untried = board.get_empty_squares()
+        else:
+            self.untried = []
+        self.visits = 0
+        self.wins = 0.0
+
+
+class MCTSPlayer:
+    """
+    UCT player that reuses its search tree from move to move.
+    """
+    def __init__(self, exploration=UCT_CONSTANT, seed=None):
+        self._exploration = exploration
+        self._rng = random.Random(seed)
+        self._root = None
+
+    def _find_root(self, board, player):
+        """
+        Return the tree node for board, re-rooting the kept tree at it
+        if it is the current root or one of its children.
+        """
+        key = _board_key(board)
+        root = self._root
+        if root is not None:
+            if root.key == key and root.player == player:
+                return root
+            for child in root.children.values():
+                if child.key == key and child.player == player:
+                    child.parent = None
+                    return child
+        return _Node(board.clone(), player)
+
+    def _select(self, node):
+        """
+        Return the child of node with the highest UCT value.
+        """
+        log_visits = math.log(node.visits)
+        best_value = None
+        best_child = None
+        for child in node.children.values():
+            value = (child.wins / child.visits + self._exploration *
+                     math.sqrt(log_visits / child.visits))
+            if best_value is None or value > best_value:
+                best_value = value
+                best_child = child
+        return best_child
+
+    def _playout(self, board, player):
+        """
+        Play random moves on board until the game ends, and return the
+        result of check_win().
+        """
+        winner = board.check_win()
+        while winner is None:
+            row, col = self._rng.choice(board.get_empty_squares())
+            board.move(row, col, player)
+            player = switch_player(player)
+            winner = board.check_win()
+        return winner
+
+    def _iterate(self, root):
+        """
+        Run one selection, expansion, playout and backup pass.
+        """
+        node = root
+        while not node.untried and node.children:
+            node = self._select(node)
+        if node.untried:
+            move = node.untried.pop(self._rng.randrange(len(node.untried)))
+            board = node.board.clone()
+            board.move(move[0], move[1], node.player)
+            child = _Node(board, switch_player(node.player), node, move)
+            node.children[move] = child
+            node = child
+        if node.result is None:
+            result = self._playout(node.board.clone(), node.player)
+        else:
+            result = node.result
+        while node is not None:
+            node.visits += 1
+            if result == DRAW:
+                node.wins += 0.5
+            elif result != node.player:
+                node.wins += 1.0
+            node = node.parent
+
+    def move(self, board, player, trials, time_budget=None):
+        """
+        Return a move for player as a (row, col) tuple.  Runs trials
+        iterations, or searches for time_budget seconds if it is given.
+        """
+        root = self._find_root(board, player)
+        if time_budget is None:
+            for dummy_trial in range(trials):
+                self._iterate(root)
+        else:
+            deadline = time.time() + time_budget
+            while time.time() < deadline:
+                self._iterate(root)
+        if not root.children:
+            self._iterate(root)
+        best = max(root.children.values(), key=lambda child: child.visits)
+        self._root = best
+        return best.move
+
+
+_PLAYER = MCTSPlayer()
+
+
+def mcts_move(board, player, trials):
+    """
+    Return a move for the machine player as a (row, col) tuple, using
+    the shared MCTSPlayer and TIME_BUDGET.
+    """
+    return _PLAYER.move(board, player, trials, TIME_BUDGET)
@@ -0,0 +1,207 @@
+"""
+Vectorized Monte Carlo Tic-Tac-Toe player.
+
+Plays the same random games as mc_trial in MonteCarloTicTacToePlayer.py
+and scores them the same way as mc_update_scores, but runs many trials
+at once with NumPy.  Each trial is a random order of the empty squares;
+the players fill them alternately and the game ends at the first
+completed line.
+
+parallel_mc_move splits the trials over a process pool.  Every worker
+scores its share with its own RandomState seeded from (seed, worker
+index), and the partial score grids are summed in worker order, so the
+result is fixed for a given seed and number of workers.
+"""
+
+import atexit
+import multiprocessing
+
+import numpy
+
+from ttt_bitboard import (EMPTY, PLAYERX, PLAYERO, DRAW, TTTBitBoard,
+                          board_lines, switch_player)
+
+# Constants for Monte Carlo simulator
+NTRIALS = 20000       # Number of trials to run
+SCORE_CURRENT = 1.0   # Score for squares played by the current player
+SCORE_OTHER = 1.0     # Score for squares played by the other player
+
+# Number of trials simulated together in one set of arrays.
+CHUNK_SIZE = 4096
+
+# Flat square indices of every line, per board size.
+_LINES = {}
+
+# Worker pools of parallel_mc_move, per number of workers.  Each is
+# created on first use and kept for later moves.
+_POOLS = {}
+
+
+def _lines(dim):
+    """
+    Return a (lines, dim) array of the flat indices of every line of a
+    dim x dim board.
+    """
+    if dim not in _LINES:
+        _LINES[dim] = numpy.array([[row * dim + col for row, col in line]
+                                   for line in board_lines(dim)])
+    return _LINES[dim]
+
+
+def _squares(board):
+    """
+    Return the squares of board as a flat array.
+    """
+    dim = board.get_dim()
+    return numpy.array([board.square(row, col)
+                        for row in range(dim) for col in range(dim)])
+
+
+def mc_scores(board, player, trials, rng=numpy.random, reverse=False):
+    """
+    Run trials random games from board with player to move, and return
+    the summed score of every square as a flat array.
+
+    rng is a numpy.random.RandomState (or the numpy.random module).
+    reverse selects the variant where completing a line loses.
+    """
+    dim = board.get_dim()
+    squares = _squares(board)
+    empties = numpy.flatnonzero(squares == EMPTY)
+    lines = _lines(dim)
+    other = switch_player(player)
+    scores = numpy.zeros(dim * dim)
+    never = len(empties) + 1
+    turn = numpy.arange(len(empties))
+    movers = numpy.where(turn % 2 == 0, player, other)
+    done = 0
+    while done < trials:
+        count = min(CHUNK_SIZE, trials - done)
+        done += count
+        trial = numpy.arange(count)[:, None]
+        # Where each trial puts its moves, and when each square is filled
+        # (-1 for squares that were filled before the trial started).
+        targets = empties[numpy.argsort(rng.random_sample(
+            (count, len(empties))), axis=1)]
+        owner = numpy.tile(squares, (count, 1))
+        owner[trial, targets] = movers
+        filled = numpy.full((count, dim * dim), -1)
+        filled[trial, targets] = turn
+
+        line_owner = owner[:, lines]
+        x_lines = (line_owner == PLAYERX).all(axis=2)
+        o_lines = (line_owner == PLAYERO).all(axis=2)
+        completed = numpy.where(x_lines | o_lines,
+                                filled[:, lines].max(axis=2), never)
+        first = completed.argmin(axis=1)
+        end = completed[trial[:, 0], first]
+        winner = numpy.where(x_lines[trial[:, 0], first], PLAYERX, PLAYERO)
+        if reverse:
+            winner = numpy.where(winner == PLAYERX, PLAYERO, PLAYERX)
+        winner = numpy.where(end < never, winner, DRAW)
+
+        # Squares filled after the winning move were never played.
+        played = filled <= end[:, None]
+        weights = (SCORE_CURRENT * ((owner == player) & played) -
+                   SCORE_OTHER * ((owner == other) & played))
+        sign = (winner == player).astype(float) - (winner == other)
+        scores += numpy.dot(sign, weights)
+    return scores
+
+
+def get_best_move(board, scores, rng=numpy.random):
+    """
+    Return a random (row, col) among the empty squares of board with
+    the highest score.  scores is a flat array as from mc_scores.
+    """
+    dim = board.get_dim()
+    empties = board.get_empty_squares()
+    values = [scores[row * dim + col] for row, col in empties]
+    max_val = max(values)
+    best = [square for square, value in zip(empties, values)
+            if value == max_val]
+    return best[rng.randint(len(best))]
+
+
+def mc_move(board, player, trials, rng=numpy.random, reverse=False,
+            log=None):
+    """
+    Return a move for the machine player as a (row, col) tuple, using
+    trials random games.
+
+    log, if given, is called with the board, the score grid (a list of
+    lists) and the chosen move.
+    """
+    scores = mc_scores(board, player, trials, rng, reverse)
+    move = get_best_move(board, scores, rng)
+    if log is not None:
+        dim = board.get_dim()
+        log(board, scores.reshape(dim, dim).tolist(), move)
+    return move
+
+
+def _mc_worker(task):
+    """
+    Score a share of the trials in a worker process.  task is (squares
+    as a list of lists, player, trials, seed, reverse).
+    """
+    squares, player, trials, seed, reverse = task
+    board = TTTBitBoard(len(squares), reverse, squares)
+    return mc_scores(board, player, trials, numpy.random.RandomState(seed),
+                     reverse)
+
+
+def _get_pool(workers):
+    """
+    Return the kept pool of workers processes, creating it if needed.
+    """
+    if workers not in _POOLS:
+        _POOLS[workers] = multiprocessing.Pool(workers)
+    return _POOLS[workers]
+
+
+def close_pools():
+    """
+    Shut down the pools kept by parallel_mc_move.
+    """
+    for pool in _POOLS.values():
+        pool.close()
+        pool.join()
+    _POOLS.clear()
+
+
+atexit.register(close_pools)
+
+
+def parallel_mc_move(board, player, trials, workers=None, seed=0,
+                     reverse=False, pool=None, log=None):
+    """
+    Return a move for the machine player as a (row, col) tuple, running
+    trials random games split over workers processes.
+
+    workers defaults to the number of CPUs.  pool is an optional
+    multiprocessing.Pool to run on; otherwise a pool of workers
+    processes kept by this module is used, so only the first move pays
+    for starting the processes.  log works as in mc_move.
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    dim = board.get_dim()
+    squares = [[board.square(row, col) for col in range(dim)]
+               for row in range(dim)]
+    tasks = []
+    for index in range(workers):
+        share = trials // workers + (1 if index < trials % workers else 0)
+        if share:
+            tasks.append((squares, player, share, [seed, index], reverse))
+    if pool is None:
+        pool = _get_pool(workers)
+    partials = pool.map(_mc_worker, tasks)
+    scores = numpy.zeros(dim * dim)
+    for partial in partials:
+        scores += partial
+    move = get_best_move(board, scores,
+                         numpy.random.RandomState([seed, workers]))
+    if log is not None:
+        log(board, scores.reshape(dim, dim).tolist(), move)
+    return move
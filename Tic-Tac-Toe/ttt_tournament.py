@@ -0,0 +1,292 @@
+"""
+Headless tournament runner for Tic-Tac-Toe players.
+
+Plays two move functions with the (board, player, trials) interface
+against each other on TTTBitBoard, alternating who plays PLAYERX, and
+reports win/draw/loss rates with 95% confidence intervals, per-move
+latency percentiles and board moves per second.  Games run in parallel
+over a process pool.  Each game seeds random and numpy.random from the
+seed and its index, so for players that draw from those generators and
+keep no state between moves the results do not depend on the number of
+workers.  Players that start their own process pool, like
+parallel_mc_move, need --workers 1.
+
+Players are given as module:function, for example
+ttt_mcts:mcts_move or MonteCarloTicTacToePlayer:mc_move, or as
+path.py:function for files whose names are not module names, such as
+Mini-maxTic-Tac-ToePlayer.py:move_wrapper.  With --min-points the
+runner exits with status 1 when the first player scores less than that
+fraction of the points, so it can be used as a regression gate.
+
+Usage: python ttt_tournament.py Mini-maxTic-Tac-ToePlayer.py:move_wrapper
+       ttt_mcts:mcts_move
+"""
+
+import argparse
+import importlib
+import math
+import multiprocessing
+import os
+import random
+import sys
+import timeit
+
+try:
+    from importlib import util as importlib_util
+except ImportError:
+    import imp
+    importlib_util = None
+
+from ttt_bitboard import PLAYERX, PLAYERO, DRAW, TTTBitBoard, switch_player
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# z value of a 95% confidence interval.
+Z_95 = 1.96
+
+PERCENTILES = (50, 95, 99)
+
+SEED_MULTIPLIER = 1000003
+
+# Modules loaded from files by _load_module, per absolute path, so
+# module state such as transposition tables lasts between games.
+_FILE_MODULES = {}
+
+
+class CountingBoard(TTTBitBoard):
+    """
+    TTTBitBoard that counts the moves made on it and on its clones, as
+    a measure of the nodes or playout steps an engine visits.
+    """
+    moves = 0
+
+    def move(self, row, col, player):
+        """
+        Place player on the board at position (row, col).
+        """
+        CountingBoard.moves += 1
+        TTTBitBoard.move(self, row, col, player)
+
+
+def _load_module(name):
+    """
+    Import a module by name, or from a file if name ends in .py.  Files
+    whose names are not identifiers, like Mini-maxTic-Tac-ToePlayer.py,
+    can only be loaded this way.
+    """
+    if not name.endswith(".py"):
+        return importlib.import_module(name)
+    path = os.path.abspath(name)
+    if path not in _FILE_MODULES:
+        directory = os.path.dirname(path)
+        if directory not in sys.path:
+            # So the file can import its neighbours, like ttt_bitboard.
+            sys.path.insert(0, directory)
+        module_name = os.path.splitext(os.path.basename(path))[0]
+        if importlib_util is None:
+            module = imp.load_source(module_name, path)
+        else:
+            spec = importlib_util.spec_from_file_location(module_name, path)
+            module = importlib_util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        _FILE_MODULES[path] = module
+    return _FILE_MODULES[path]
+
+
+def load_player(spec):
+    """
+    Return the move function named by a module:function or
+    path.py:function string.
+    """
+    module_name, dummy_sep, function_name = spec.rpartition(":")
+    if not module_name:
+        raise ValueError("player must be given as module:function, got %r"
+                         % spec)
+    return getattr(_load_module(module_name), function_name)
+
+
+def play_one(task):
+    """
+    Play one game.  task is (player x spec, player o spec, dim, trials,
+    reverse, seed).  Returns the result of check_win() and, per spec,
+    the list of move latencies in seconds and the board moves made.
+    """
+    x_spec, o_spec, dim, trials, reverse, seed = task
+    random.seed(seed)
+    if numpy is not None:
+        numpy.random.seed(seed)
+    move_functions = {PLAYERX: load_player(x_spec),
+                      PLAYERO: load_player(o_spec)}
+    latencies = {PLAYERX: [], PLAYERO: []}
+    nodes = {PLAYERX: 0, PLAYERO: 0}
+    board = CountingBoard(dim, reverse)
+    player = PLAYERX
+    winner = None
+    while winner is None:
+        CountingBoard.moves = 0
+        start = timeit.default_timer()
+        row, col = move_functions[player](board.clone(), player, trials)
+        latencies[player].append(timeit.default_timer() - start)
+        nodes[player] += CountingBoard.moves
+        board.move(row, col, player)
+        winner = board.check_win()
+        player = switch_player(player)
+    return winner, latencies, nodes
+
+
+def wilson_interval(successes, total, z_score=Z_95):
+    """
+    Return the Wilson score interval (low, high) of a proportion.
+    """
+    if total == 0:
+        return 0.0, 1.0
+    phat = float(successes) / total
+    denom = 1 + z_score * z_score / total
+    center = phat + z_score * z_score / (2 * total)
+    margin = z_score * math.sqrt(phat * (1 - phat) / total +
+                                 z_score * z_score / (4 * total * total))
+    return (max(0.0, (center - margin) / denom),
+            min(1.0, (center + margin) / denom))
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percentile of a list of numbers.
+    """
+    ordered = sorted(values)
+    rank = int(math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[max(0, rank - 1)]
+
+
+class _Record:
+    """
+    Results and timings of one player over a tournament.
+    """
+    def __init__(self, spec):
+        self.spec = spec
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.latencies = []
+        self.nodes = 0
+
+    def games(self):
+        """
+        Number of games played.
+        """
+        return self.wins + self.draws + self.losses
+
+    def points(self):
+        """
+        Fraction of the points scored, counting a draw as half a win.
+        """
+        return (self.wins + 0.5 * self.draws) / max(1, self.games())
+
+
+def run_tournament(spec_a, spec_b, games, dim=3, trials=100, reverse=False,
+                   workers=None, seed=0):
+    """
+    Play games games between two players, alternating colors, and
+    return a _Record for each.
+    """
+    tasks = []
+    for index in range(games):
+        game_seed = (seed * SEED_MULTIPLIER + index) % (2 ** 32)
+        if index % 2 == 0:
+            tasks.append((spec_a, spec_b, dim, trials, reverse, game_seed))
+        else:
+            tasks.append((spec_b, spec_a, dim, trials, reverse, game_seed))
+    if workers == 1:
+        results = [play_one(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(play_one, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    record_a = _Record(spec_a)
+    record_b = _Record(spec_b)
+    for index, (winner, latencies, nodes) in enumerate(results):
+        if index % 2 == 0:
+            colors = ((record_a, PLAYERX), (record_b, PLAYERO))
+        else:
+            colors = ((record_b, PLAYERX), (record_a, PLAYERO))
+        for record, color in colors:
+            record.latencies.extend(latencies[color])
+            record.nodes += nodes[color]
+            if winner == DRAW:
+                record.draws += 1
+            elif winner == color:
+                record.wins += 1
+            else:
+                record.losses += 1
+    return record_a, record_b
+
+
+def print_report(records):
+    """
+    Print results and timings for each player.
+    """
+    for record in records:
+        games = record.games()
+        print("%s: %d games, %.1f%% of points" %
+              (record.spec, games, 100.0 * record.points()))
+        for name, count in (("wins", record.wins), ("draws", record.draws),
+                            ("losses", record.losses)):
+            low, high = wilson_interval(count, games)
+            print("  %-6s %5d  %5.1f%%  [%5.1f%%, %5.1f%%]" %
+                  (name, count, 100.0 * count / max(1, games),
+                   100.0 * low, 100.0 * high))
+        if record.latencies:
+            print("  latency " + "  ".join(
+                ["p%d %.2f ms" % (percent,
+                                  1000 * percentile(record.latencies,
+                                                    percent))
+                 for percent in PERCENTILES]))
+            total = sum(record.latencies)
+            if record.nodes and total:
+                # Engines that play out games in their own arrays, like
+                # ttt_montecarlo, make no moves on the board.
+                print("  %d moves, %.0f board moves/sec" %
+                      (len(record.latencies), record.nodes / total))
+            else:
+                print("  %d moves" % len(record.latencies))
+
+
+def main():
+    """
+    Run a tournament from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Play two Tic-Tac-Toe players against each other.")
+    parser.add_argument("player_a", help="module:function")
+    parser.add_argument("player_b", help="module:function")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--dim", type=int, default=3)
+    parser.add_argument("--trials", type=int, default=100)
+    parser.add_argument("--reverse", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-points", type=float, default=None,
+                        help="fail if player_a scores less than this "
+                        "fraction of the points")
+    args = parser.parse_args()
+    start = timeit.default_timer()
+    records = run_tournament(args.player_a, args.player_b, args.games,
+                             args.dim, args.trials, args.reverse,
+                             args.workers, args.seed)
+    elapsed = timeit.default_timer() - start
+    print_report(records)
+    print("%d games in %.2f s" % (args.games, elapsed))
+    if args.min_points is not None and records[0].points() < args.min_points:
+        print("FAIL: %s scored %.3f of the points, below %.3f" %
+              (args.player_a, records[0].points(), args.min_points))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
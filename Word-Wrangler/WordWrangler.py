@@ -2,10 +2,6 @@
 Word Wrangler game
 """
 
-import urllib2
-import codeskulptor
-import poc_wrangler_provided as provided
-
 WORDFILE = "assets_scrabble_words3.txt"
 
 
@@ -43,10 +39,6 @@ def intersect(list1, list2):
     while index1 < len(list1) and index2 < len(list2):
             item1 = list1[index1]
             item2 = list2[index2]
-            if type(item1) != int:
-                item1 = ord(list1[index1])
-            if type(item2) != int:
-                item2 = ord(list2[index2])
             if item1 == item2:
                 intersect_list.append(list1[index1])
                 index1 += 1
@@ -77,10 +69,6 @@ def merge(list1, list2):
     while index1 < len(list1) and index2 < len(list2):
             item1 = list1[index1]
             item2 = list2[index2]
-            if type(item1) != int:
-                item1 = ord(list1[index1])
-            if type(item2) != int:
-                item2 = ord(list2[index2])
 #            if item1 == item2:
 #                merge_list.append(list1[index1])
 #                index1 += 1
@@ -108,7 +96,7 @@ def merge_sort(list1):
     if len(list1) < 2:
         return list1
 
-    middle = len(list1)/2
+    middle = len(list1) // 2
     left = merge_sort(list1[:middle])
     right = merge_sort(list1[middle:])
 
@@ -145,6 +133,37 @@ def gen_all_strings(word):
     new_strings.extend(rest_strings)
     return new_strings
 
+def gen_distinct_strings(word, prefix_ok=None):
+    """
+    Generate the same strings as gen_all_strings, each exactly once,
+    in sorted order and one at a time.
+
+    prefix_ok is an optional function, such as WordIndex.has_prefix,
+    that returns False for a string that no wanted string starts with;
+    those strings and all their extensions are skipped.
+    """
+    counts = {}
+    for letter in word:
+        counts[letter] = counts.get(letter, 0) + 1
+    return _gen_distinct(sorted(counts), counts, "", prefix_ok)
+
+def _gen_distinct(letters, counts, prefix, prefix_ok):
+    """
+    Yield prefix and every distinct extension of it using the letters
+    left in counts.
+    """
+    yield prefix
+    for letter in letters:
+        if counts[letter] == 0:
+            continue
+        string = prefix + letter
+        if prefix_ok is not None and not prefix_ok(string):
+            continue
+        counts[letter] -= 1
+        for extension in _gen_distinct(letters, counts, string, prefix_ok):
+            yield extension
+        counts[letter] += 1
+
 # Function to load words from a file
 
 def load_words(filename):
@@ -153,6 +172,8 @@ def load_words(filename):
 
     Returns a list of strings.
     """
+    import urllib2
+    import codeskulptor
     url = codeskulptor.file2url(filename)
     netfile = urllib2.urlopen(url)
     data = []
@@ -164,6 +185,7 @@ def run():
     """
     Run game.
     """
+    import poc_wrangler_provided as provided
     words = load_words(WORDFILE)
     wrangler = provided.WordWrangler(words, remove_duplicates, 
                                      intersect, merge_sort, 
@@ -172,5 +194,6 @@ def run():
 
 # Uncomment when you are ready to try the game
 #run()
-print gen_all_strings('')
-print remove_duplicates([])
\ No newline at end of file
+if __name__ == "__main__":
+    print(gen_all_strings(''))
+    print(remove_duplicates([]))
\ No newline at end of file
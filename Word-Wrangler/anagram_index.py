@@ -0,0 +1,176 @@
+"""
+Anagram index of a Word Wrangler dictionary, for choosing puzzle words.
+
+Words are grouped by signature, the string of their letters in sorted
+order, so all anagrams of a word share one entry.  For every signature
+the index also counts the dictionary words that can be spelled with
+some of its letters, which is the number of words a player has to find
+when that word is the puzzle.
+
+The counts are found by walking the sub-multisets of each signature in
+sorted order, and stopping as soon as the letters chosen so far do not
+start any signature in the dictionary.  Each signature is only
+counted once, however many words share it.
+
+Usage: python anagram_index.py WORDFILE --min-words 20 --max-words 60
+"""
+
+import argparse
+import random
+import timeit
+
+import word_cache
+
+
+def signature(word):
+    """
+    Return the letters of word in sorted order.
+    """
+    return "".join(sorted(word))
+
+
+class AnagramIndex:
+    """
+    Dictionary words grouped by signature, with sub-word counts.
+    """
+    def __init__(self, words):
+        """
+        Build the index from an iterable of words.
+        """
+        groups = {}
+        for word in words:
+            groups.setdefault(signature(word), set()).add(word)
+        self._groups = dict((key, tuple(sorted(group)))
+                            for key, group in groups.items())
+        # Number of words with each signature, and 0 for every other
+        # string that starts a signature.
+        self._nodes = {}
+        for key, group in self._groups.items():
+            for end in range(1, len(key)):
+                self._nodes.setdefault(key[:end], 0)
+            self._nodes[key] = len(group)
+        self._sub_counts = {}
+
+    def __len__(self):
+        """
+        Return the number of words in the index.
+        """
+        return sum(len(group) for group in self._groups.values())
+
+    def anagrams(self, word):
+        """
+        Return the dictionary words with exactly the letters of word.
+        """
+        return self._groups.get(signature(word), ())
+
+    def sub_words(self, letters):
+        """
+        Return a sorted list of the dictionary words that can be spelled
+        with some of letters.
+        """
+        found = []
+        for key in self._sub_signatures(signature(letters)):
+            found.extend(self._groups[key])
+        return sorted(found)
+
+    def _sub_signatures(self, key):
+        """
+        Return the dictionary signatures that are sub-multisets of the
+        signature key.
+        """
+        found = []
+        nodes = self._nodes
+        # Each entry is a sub-signature and the letters of key that may
+        # still follow it: those after its last letter, in order.
+        stack = [("", key)]
+        while stack:
+            prefix, rest = stack.pop()
+            previous = None
+            for index, letter in enumerate(rest):
+                if letter == previous:
+                    continue
+                previous = letter
+                extended = prefix + letter
+                count = nodes.get(extended)
+                if count is None:
+                    continue
+                if count:
+                    found.append(extended)
+                if index + 1 < len(rest):
+                    stack.append((extended, rest[index + 1:]))
+        return found
+
+    def count_sub_words(self, word):
+        """
+        Return the number of dictionary words that can be spelled with
+        some of the letters of word, including its own anagrams.
+        """
+        key = signature(word)
+        if key not in self._sub_counts:
+            nodes = self._nodes
+            self._sub_counts[key] = sum(
+                [nodes[sub] for sub in self._sub_signatures(key)])
+        return self._sub_counts[key]
+
+    def rank_words(self, min_length=1, max_length=None):
+        """
+        Return (sub-word count, word) for every dictionary word with
+        min_length to max_length letters, most sub-words first.
+        """
+        ranked = []
+        for key, group in self._groups.items():
+            if len(key) < min_length:
+                continue
+            if max_length is not None and len(key) > max_length:
+                continue
+            count = self.count_sub_words(key)
+            for word in group:
+                ranked.append((count, word))
+        ranked.sort(key=lambda item: (-item[0], item[1]))
+        return ranked
+
+    def pick_puzzle_word(self, min_words, max_words, min_length=1,
+                         max_length=None, rng=random):
+        """
+        Return a random dictionary word whose letters spell between
+        min_words and max_words dictionary words, or None.
+        """
+        candidates = [word for count, word
+                      in self.rank_words(min_length, max_length)
+                      if min_words <= count <= max_words]
+        if not candidates:
+            return None
+        return rng.choice(candidates)
+
+
+def main():
+    """
+    Rank the words of a word file and pick a puzzle word.
+    """
+    parser = argparse.ArgumentParser(
+        description="Pick Word Wrangler puzzle words.")
+    parser.add_argument("wordfile")
+    parser.add_argument("--min-words", type=int, default=20)
+    parser.add_argument("--max-words", type=int, default=60)
+    parser.add_argument("--min-length", type=int, default=5)
+    parser.add_argument("--max-length", type=int, default=9)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    start = timeit.default_timer()
+    index = AnagramIndex(word_cache.load_words(args.wordfile))
+    built = timeit.default_timer()
+    ranked = index.rank_words(args.min_length, args.max_length)
+    ranked_time = timeit.default_timer()
+    print("%d words indexed in %.2f s, %d ranked in %.2f s" %
+          (len(index), built - start, len(ranked), ranked_time - built))
+    for count, word in ranked[:args.top]:
+        print("%6d  %s" % (count, word))
+    word = index.pick_puzzle_word(args.min_words, args.max_words,
+                                  args.min_length, args.max_length,
+                                  random.Random(args.seed))
+    print("puzzle word: %s" % word)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+"""
+Sorted list functions for Word Wrangler, for large word lists.
+
+remove_duplicates, intersect, merge and merge_sort take and return the
+same things as the functions in WordWrangler.py, so they can be passed
+to provided.WordWrangler in their place, but they do not copy their
+inputs at every level of recursion: merge_sort is a bottom-up merge
+sort that moves items between the result list and one buffer of the
+same size, and intersect gallops through the longer list when the
+lengths are very different.
+
+merge_lists merges any number of sorted lists with heapq.
+"""
+
+import bisect
+import heapq
+
+# merge_sort sorts runs of this many items by binary insertion before
+# merging them.
+RUN_LENGTH = 32
+
+# intersect gallops when one list is this many times longer than the
+# other.
+GALLOP_RATIO = 16
+
+
+def remove_duplicates(list1):
+    """
+    Eliminate duplicates in a sorted list.
+
+    Returns a new sorted list with the same elements in list1, but
+    with no duplicates.
+    """
+    list_out = []
+    previous = object()
+    for item in list1:
+        if item != previous:
+            list_out.append(item)
+            previous = item
+    return list_out
+
+
+def _gallop(items, target, low):
+    """
+    Return the first index at or after low where items[index] >= target,
+    probing low + 1, low + 3, low + 7, ... before a binary search.
+    """
+    step = 1
+    high = low
+    length = len(items)
+    while high < length and items[high] < target:
+        low = high + 1
+        high += step
+        step *= 2
+    return bisect.bisect_left(items, target, low, min(high, length))
+
+
+def intersect(list1, list2):
+    """
+    Compute the intersection of two sorted lists.
+
+    Returns a new sorted list containing only elements that are in
+    both list1 and list2.
+    """
+    if len(list1) * GALLOP_RATIO < len(list2):
+        return _intersect_gallop(list1, list2)
+    if len(list2) * GALLOP_RATIO < len(list1):
+        return _intersect_gallop(list2, list1)
+    intersect_list = []
+    index1 = 0
+    index2 = 0
+    len1 = len(list1)
+    len2 = len(list2)
+    while index1 < len1 and index2 < len2:
+        item1 = list1[index1]
+        item2 = list2[index2]
+        if item1 == item2:
+            intersect_list.append(item1)
+            index1 += 1
+            index2 += 1
+        elif item1 < item2:
+            index1 += 1
+        else:
+            index2 += 1
+    return intersect_list
+
+
+def _intersect_gallop(short, long_list):
+    """
+    Intersect a short sorted list with a much longer one by searching
+    the long list for each item of the short one.
+    """
+    intersect_list = []
+    index = 0
+    length = len(long_list)
+    for item in short:
+        index = _gallop(long_list, item, index)
+        if index == length:
+            break
+        if long_list[index] == item:
+            intersect_list.append(item)
+            index += 1
+    return intersect_list
+
+
+def merge(list1, list2):
+    """
+    Merge two sorted lists.
+
+    Returns a new sorted list containing those elements that are in
+    either list1 or list2.
+    """
+    if not list1 or not list2:
+        return list(list1) + list(list2)
+    source = list(list1) + list(list2)
+    target = [None] * len(source)
+    _merge_runs(source, target, 0, len(list1), len(source))
+    return target
+
+
+def merge_lists(lists):
+    """
+    Merge any number of sorted lists into one new sorted list.
+    """
+    return list(heapq.merge(*lists))
+
+
+def _merge_runs(source, target, low, middle, high):
+    """
+    Merge the non-empty sorted runs source[low:middle] and
+    source[middle:high] into target[low:high].
+    """
+    if not source[middle] < source[middle - 1]:
+        target[low:high] = source[low:high]
+        return
+    index1 = low
+    index2 = middle
+    out = low
+    item1 = source[index1]
+    item2 = source[index2]
+    while True:
+        if item2 < item1:
+            target[out] = item2
+            out += 1
+            index2 += 1
+            if index2 == high:
+                target[out:high] = source[index1:middle]
+                return
+            item2 = source[index2]
+        else:
+            target[out] = item1
+            out += 1
+            index1 += 1
+            if index1 == middle:
+                target[out:high] = source[index2:high]
+                return
+            item1 = source[index1]
+
+
+def merge_sort(list1):
+    """
+    Sort the elements of list1.
+
+    Return a new sorted list with the same elements as list1.  The sort
+    is stable.
+    """
+    source = list(list1)
+    length = len(source)
+    for low in range(0, length, RUN_LENGTH):
+        run = []
+        for item in source[low:low + RUN_LENGTH]:
+            bisect.insort_right(run, item)
+        source[low:low + RUN_LENGTH] = run
+    target = [None] * length
+    width = RUN_LENGTH
+    while width < length:
+        for low in range(0, length, 2 * width):
+            middle = min(low + width, length)
+            high = min(low + 2 * width, length)
+            if middle < high:
+                _merge_runs(source, target, low, middle, high)
+            else:
+                target[low:high] = source[low:high]
+        source, target = target, source
+        width *= 2
+    return source
@@ -0,0 +1,114 @@
+"""
+Benchmark sorted_lists against the list functions in WordWrangler.py.
+
+Uses the words of a word file, or random words when no file is given,
+checks that both versions give the same results as the built-in sort,
+and prints the time each takes.
+
+Usage: python sorted_lists_benchmark.py --words 200000 [--wordfile FILE]
+"""
+
+import argparse
+import random
+import timeit
+
+import WordWrangler
+import sorted_lists
+
+LETTERS = "abcdefghijklmnopqrstuvwxyz"
+
+
+def random_words(count, rng):
+    """
+    Return count random lowercase words of 2 to 12 letters.
+    """
+    return ["".join([rng.choice(LETTERS)
+                     for dummy_index in range(rng.randint(2, 12))])
+            for dummy_word in range(count)]
+
+
+def _time(function, *args):
+    """
+    Return (result, seconds) of one call of function.
+    """
+    start = timeit.default_timer()
+    result = function(*args)
+    return result, timeit.default_timer() - start
+
+
+def compare(name, expected, calls):
+    """
+    Time each (label, function, args) in calls, check its result and
+    print the timings.
+    """
+    times = []
+    for label, function, args in calls:
+        result, seconds = _time(function, *args)
+        if result != expected:
+            raise AssertionError("%s: %s gave a wrong result" % (name, label))
+        times.append(seconds)
+    print("%-22s %9.3f s %9.3f s %7.1fx" %
+          (name, times[0], times[1], times[0] / max(times[1], 1e-9)))
+
+
+def reduce_merge(lists):
+    """
+    Merge sorted lists pairwise with WordWrangler.merge.
+    """
+    result = []
+    for part in lists:
+        result = WordWrangler.merge(result, part)
+    return result
+
+
+def main():
+    """
+    Run the benchmark.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Word Wrangler sorted list functions.")
+    parser.add_argument("--words", type=int, default=200000)
+    parser.add_argument("--wordfile", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    if args.wordfile:
+        with open(args.wordfile) as word_file:
+            words = [line.strip() for line in word_file if line.strip()]
+        words = words[:args.words]
+    else:
+        words = random_words(args.words, rng)
+    rng.shuffle(words)
+    ordered = sorted(words)
+    half = sorted(words[:len(words) // 2])
+    other = sorted(words[len(words) // 4:])
+    few = sorted(rng.sample(words, max(1, len(words) // 1000)))
+    parts = [sorted(words[index::8]) for index in range(8)]
+
+    print("%d words" % len(words))
+    print("%-22s %11s %11s %8s" % ("", "WordWrangler", "sorted_lists",
+                                   "speedup"))
+    compare("merge_sort", ordered,
+            [("WordWrangler", WordWrangler.merge_sort, (words,)),
+             ("sorted_lists", sorted_lists.merge_sort, (words,))])
+    compare("merge", sorted(half + other),
+            [("WordWrangler", WordWrangler.merge, (half, other)),
+             ("sorted_lists", sorted_lists.merge, (half, other))])
+    compare("merge 8 lists", ordered,
+            [("WordWrangler", reduce_merge, (parts,)),
+             ("sorted_lists", sorted_lists.merge_lists, (parts,))])
+    expected = WordWrangler.intersect(half, other)
+    compare("intersect", expected,
+            [("WordWrangler", WordWrangler.intersect, (half, other)),
+             ("sorted_lists", sorted_lists.intersect, (half, other))])
+    expected = WordWrangler.intersect(few, ordered)
+    compare("intersect 1:1000", expected,
+            [("WordWrangler", WordWrangler.intersect, (few, ordered)),
+             ("sorted_lists", sorted_lists.intersect, (few, ordered))])
+    compare("remove_duplicates", sorted(set(words)),
+            [("WordWrangler", WordWrangler.remove_duplicates, (ordered,)),
+             ("sorted_lists", sorted_lists.remove_duplicates, (ordered,))])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Disk cache of a Word Wrangler word file.
+
+load_words reads a local word file once and writes its words, stripped,
+deduplicated and sorted, to a binary cache next to it.  Later calls
+memory-map the cache instead of reading the word file again, until the
+size or modification time of the word file changes.
+
+The cache is a header, an offsets table with one more entry than there
+are words, and the words themselves, back to back: word i is the bytes
+from offsets[i] to offsets[i + 1] of the word data.
+
+Usage: python word_cache.py assets_scrabble_words3.txt
+"""
+
+import array
+import bisect
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import timeit
+
+CACHE_MAGIC = b"WCCH"
+CACHE_VERSION = 1
+# magic, version, number of words, source size, source mtime in ns
+CACHE_HEADER = struct.Struct("<4sBIQQ")
+CACHE_SUFFIX = ".cache"
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def _set_default_mode(path):
+    """
+    Give path the mode open() would have created it with.  mkstemp
+    makes files only their owner can read.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+def _decode(data):
+    """
+    Return the bytes of a word as a str.
+    """
+    if str is bytes:
+        return data
+    return data.decode("utf-8")
+
+
+def _source_stamp(path):
+    """
+    Return (size, modification time in nanoseconds) of a file.
+    """
+    stat = os.stat(path)
+    mtime = getattr(stat, "st_mtime_ns", None)
+    if mtime is None:
+        mtime = int(stat.st_mtime * 1000000000)
+    return stat.st_size, mtime
+
+
+class WordList:
+    """
+    Read-only sorted sequence of the words in a cache file, backed by a
+    memory map.
+    """
+    def __init__(self, cache_path):
+        with open(cache_path, "rb") as cache_file:
+            self._map = mmap.mmap(cache_file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+        (magic, version, self._count, self._source_size,
+         self._source_mtime) = CACHE_HEADER.unpack_from(self._map, 0)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            self._map.close()
+            raise ValueError("not a word cache: %s" % cache_path)
+        start = CACHE_HEADER.size
+        end = start + 4 * (self._count + 1)
+        self._offsets = array.array("I")
+        if hasattr(self._offsets, "frombytes"):
+            self._offsets.frombytes(self._map[start:end])
+        else:
+            self._offsets.fromstring(self._map[start:end])
+        if sys.byteorder == "big":
+            self._offsets.byteswap()
+        self._data_start = end
+
+    def __len__(self):
+        """
+        Return the number of words.
+        """
+        return self._count
+
+    def __getitem__(self, index):
+        """
+        Return word index, or a list of words for a slice.
+        """
+        if isinstance(index, slice):
+            return [self[item] for item in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("word index out of range")
+        start = self._data_start + self._offsets[index]
+        end = self._data_start + self._offsets[index + 1]
+        return _decode(self._map[start:end])
+
+    def __iter__(self):
+        """
+        Iterate over the words in sorted order.
+        """
+        for index in range(self._count):
+            yield self[index]
+
+    def __contains__(self, word):
+        """
+        Return True if word is in the list, by binary search.
+        """
+        index = bisect.bisect_left(self, word)
+        return index < self._count and self[index] == word
+
+    def get_source_stamp(self):
+        """
+        Return the (size, mtime in ns) of the word file the cache was
+        built from.
+        """
+        return self._source_size, self._source_mtime
+
+    def close(self):
+        """
+        Unmap the cache file.
+        """
+        self._map.close()
+
+
+def build_cache(source_path, cache_path):
+    """
+    Read the word file source_path and write its cache to cache_path.
+    The cache is written to a temporary file first and then renamed,
+    so readers never see a partial cache.
+    """
+    stamp = _source_stamp(source_path)
+    with open(source_path, "rb") as source_file:
+        words = sorted(set(line.strip() for line in source_file))
+    words = [word for word in words if word]
+    offsets = array.array("I", [0])
+    total = 0
+    for word in words:
+        total += len(word)
+        offsets.append(total)
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    directory = os.path.dirname(os.path.abspath(cache_path))
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "wb") as cache_file:
+            cache_file.write(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION,
+                                               len(words), stamp[0],
+                                               stamp[1]))
+            offsets.tofile(cache_file)
+            cache_file.write(b"".join(words))
+        _set_default_mode(temp_path)
+        _replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def load_words(source_path, cache_path=None):
+    """
+    Return a WordList of the words in source_path, rebuilding the
+    cache at cache_path (by default source_path + ".cache") if it is
+    missing or was built from a different version of the file.
+    """
+    if cache_path is None:
+        cache_path = source_path + CACHE_SUFFIX
+    stamp = _source_stamp(source_path)
+    try:
+        words = WordList(cache_path)
+    except (IOError, OSError, ValueError, struct.error):
+        words = None
+    if words is not None:
+        if words.get_source_stamp() == stamp:
+            return words
+        words.close()
+    build_cache(source_path, cache_path)
+    return WordList(cache_path)
+
+
+def main():
+    """
+    Build or check the cache of a word file and report the load time.
+    """
+    if len(sys.argv) != 2:
+        print("usage: python word_cache.py WORDFILE")
+        sys.exit(2)
+    start = timeit.default_timer()
+    words = load_words(sys.argv[1])
+    elapsed = timeit.default_timer() - start
+    print("%d words loaded in %.1f ms" % (len(words), 1000 * elapsed))
+
+
+if __name__ == "__main__":
+    main()
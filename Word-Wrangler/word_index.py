@@ -0,0 +1,210 @@
+"""
+Compact trie index of a Word Wrangler dictionary.
+
+The trie is stored in breadth-first order in three flat arrays, so the
+children of a node are consecutive nodes: node i has the letter
+_letters[i], is the end of a word if _terminal[i] is set, and has the
+children _first_child[i] up to _first_child[i + 1].  Children are in
+alphabetical order, so walks visit words in sorted order.
+
+words_from_letters finds every dictionary word that can be spelled with
+some of the given letters by walking the trie with the letter counts,
+instead of generating every arrangement and looking each one up.
+
+Usage: python word_index.py assets_scrabble_words3.txt words.idx
+"""
+
+import array
+import bisect
+import struct
+import sys
+
+INDEX_MAGIC = b"WIDX"
+INDEX_VERSION = 1
+INDEX_HEADER = struct.Struct("<4sBII")
+
+ROOT = 0
+
+
+def _read_array(index_file, typecode, count):
+    """
+    Read count little-endian items of an array from index_file.
+    """
+    items = array.array(typecode)
+    items.fromfile(index_file, count)
+    if sys.byteorder == "big":
+        items.byteswap()
+    return items
+
+
+def _write_array(index_file, items):
+    """
+    Write an array to index_file in little-endian order.
+    """
+    if sys.byteorder == "big":
+        items = array.array(items.typecode, items)
+        items.byteswap()
+    items.tofile(index_file)
+
+
+class WordIndex:
+    """
+    Array-backed trie of a word list.
+    """
+    def __init__(self, words=()):
+        """
+        Build the index from an iterable of words.  Words must be ASCII.
+        """
+        root = {}
+        count = 0
+        for word in words:
+            node = root
+            for letter in word:
+                node = node.setdefault(letter, {})
+            if None not in node:
+                node[None] = True
+                count += 1
+        self._size = count
+        self._letters = array.array("B", [0])
+        self._terminal = array.array("B", [0])
+        self._first_child = array.array("I")
+        queue = [root]
+        for node in queue:
+            self._first_child.append(len(self._letters))
+            for letter in sorted(key for key in node if key is not None):
+                child = node[letter]
+                self._letters.append(ord(letter))
+                self._terminal.append(1 if None in child else 0)
+                queue.append(child)
+        self._first_child.append(len(self._letters))
+
+    def __len__(self):
+        """
+        Return the number of words in the index.
+        """
+        return self._size
+
+    def __contains__(self, word):
+        """
+        Return True if word is in the index.
+        """
+        node = self._find(word)
+        return node >= 0 and self._terminal[node] == 1
+
+    def get_num_nodes(self):
+        """
+        Return the number of trie nodes, including the root.
+        """
+        return len(self._letters)
+
+    def _child(self, node, letter):
+        """
+        Return the child of node for letter, or -1 if there is none.
+        """
+        low = self._first_child[node]
+        high = self._first_child[node + 1]
+        code = ord(letter)
+        index = bisect.bisect_left(self._letters, code, low, high)
+        if index < high and self._letters[index] == code:
+            return index
+        return -1
+
+    def _find(self, string):
+        """
+        Return the node reached by string, or -1.
+        """
+        node = ROOT
+        for letter in string:
+            node = self._child(node, letter)
+            if node < 0:
+                return -1
+        return node
+
+    def has_prefix(self, prefix):
+        """
+        Return True if some word in the index starts with prefix.
+        """
+        return self._find(prefix) >= 0
+
+    def words_from_letters(self, letters, min_length=1):
+        """
+        Return a sorted list of the words in the index that can be
+        spelled with some of letters, each letter used at most as many
+        times as it appears in letters.
+        """
+        counts = {}
+        for letter in letters:
+            counts[ord(letter)] = counts.get(ord(letter), 0) + 1
+        found = []
+        prefix = []
+        stack = [(ROOT, self._first_child[ROOT])]
+        while stack:
+            node, index = stack[-1]
+            if index == self._first_child[node + 1]:
+                stack.pop()
+                if prefix:
+                    counts[self._letters[node]] += 1
+                    prefix.pop()
+                continue
+            stack[-1] = (node, index + 1)
+            code = self._letters[index]
+            if counts.get(code, 0):
+                counts[code] -= 1
+                prefix.append(chr(code))
+                if self._terminal[index] and len(prefix) >= min_length:
+                    found.append("".join(prefix))
+                stack.append((index, self._first_child[index]))
+        return found
+
+    def save(self, path):
+        """
+        Write the index to path.
+        """
+        with open(path, "wb") as index_file:
+            index_file.write(INDEX_HEADER.pack(INDEX_MAGIC, INDEX_VERSION,
+                                               len(self._letters),
+                                               self._size))
+            _write_array(index_file, self._letters)
+            _write_array(index_file, self._terminal)
+            _write_array(index_file, self._first_child)
+
+
+def load_index(path):
+    """
+    Read an index written by WordIndex.save.
+    """
+    with open(path, "rb") as index_file:
+        magic, version, num_nodes, size = INDEX_HEADER.unpack(
+            index_file.read(INDEX_HEADER.size))
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError("not a word index: %s" % path)
+        index = WordIndex()
+        index._size = size
+        index._letters = _read_array(index_file, "B", num_nodes)
+        index._terminal = _read_array(index_file, "B", num_nodes)
+        index._first_child = _read_array(index_file, "I", num_nodes + 1)
+    return index
+
+
+def read_words(path):
+    """
+    Return the words of a word file, one per line.
+    """
+    with open(path) as word_file:
+        return [line.strip() for line in word_file if line.strip()]
+
+
+def main():
+    """
+    Build an index file from a word file.
+    """
+    if len(sys.argv) != 3:
+        print("usage: python word_index.py WORDFILE INDEXFILE")
+        sys.exit(2)
+    index = WordIndex(read_words(sys.argv[1]))
+    index.save(sys.argv[2])
+    print("%d words, %d nodes" % (len(index), index.get_num_nodes()))
+
+
+if __name__ == "__main__":
+    main()
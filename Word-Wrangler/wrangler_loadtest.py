@@ -0,0 +1,139 @@
+"""
+Load test for wrangler_server.py (Python 3).
+
+Opens --players connections at once, each of which starts a puzzle
+from a small pool of puzzle words and makes --guesses guesses, about
+half of them target words, then checks STATUS and quits.  Reports
+requests per second and reply latency percentiles.  With --serve the
+server runs in the same process and event loop.
+
+Usage: python3 wrangler_loadtest.py WORDFILE --players 5000 --serve
+"""
+
+import argparse
+import asyncio
+import random
+import timeit
+
+import word_cache
+import word_index
+import wrangler_server
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, percent):
+    """
+    Return the nearest-rank percentile of a sorted list of numbers.
+    """
+    rank = max(1, int(round(percent / 100.0 * len(values))))
+    return values[min(rank, len(values)) - 1]
+
+
+async def _request(reader, writer, line, latencies):
+    """
+    Send one command and return its reply, recording the latency.
+    """
+    start = timeit.default_timer()
+    writer.write(line.encode("utf-8") + b"\n")
+    reply = await reader.readline()
+    latencies.append(timeit.default_timer() - start)
+    return reply.decode("utf-8").strip()
+
+
+async def play(host, port, word, targets, guesses, rng, latencies, ready,
+               go):
+    """
+    Connect, wait for every player to be connected, then play one
+    puzzle.  Returns the number of targets found.
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    ready.release()
+    await go.wait()
+    reply = await _request(reader, writer, "NEW " + word, latencies)
+    if not reply.startswith("PUZZLE"):
+        raise RuntimeError("unexpected reply to NEW: %s" % reply)
+    found = 0
+    for dummy_guess in range(guesses):
+        if rng.random() < 0.5:
+            guess = rng.choice(targets)
+        else:
+            guess = word[::-1] + "x"
+        reply = await _request(reader, writer, "GUESS " + guess, latencies)
+        if reply.startswith("FOUND"):
+            found += 1
+    await _request(reader, writer, "STATUS", latencies)
+    await _request(reader, writer, "QUIT", latencies)
+    writer.close()
+    return found
+
+
+async def run(args, words):
+    """
+    Run the load test, starting the server first if args.serve is set.
+    """
+    server_task = None
+    if args.serve:
+        service = wrangler_server.WranglerService(words, args.seed)
+        server_task = asyncio.ensure_future(
+            wrangler_server.WranglerServer(service).serve(args.host,
+                                                          args.port))
+        await asyncio.sleep(0.2)
+    rng = random.Random(args.seed)
+    index = word_index.WordIndex(words)
+    candidates = [word for word in words
+                  if wrangler_server.MIN_PUZZLE_LENGTH <= len(word) <=
+                  wrangler_server.MAX_PUZZLE_LENGTH]
+    pool = rng.sample(candidates, min(args.puzzles, len(candidates)))
+    targets = dict((word, index.words_from_letters(word)) for word in pool)
+    latencies = []
+    ready = asyncio.Semaphore(0)
+    go = asyncio.Event()
+    players = []
+    for number in range(args.players):
+        word = rng.choice(pool)
+        players.append(asyncio.ensure_future(play(
+            args.host, args.port, word, targets[word], args.guesses,
+            random.Random(rng.random()), latencies, ready, go)))
+        # Pace new connections so the listen backlog does not overflow.
+        if number % 500 == 499:
+            await asyncio.sleep(0)
+    for dummy_player in range(args.players):
+        await ready.acquire()
+    print("%d players connected" % args.players)
+    start = timeit.default_timer()
+    go.set()
+    found = await asyncio.gather(*players)
+    elapsed = timeit.default_timer() - start
+    if server_task is not None:
+        server_task.cancel()
+    latencies.sort()
+    print("%d requests in %.2f s (%.0f requests/sec), %d targets found" %
+          (len(latencies), elapsed, len(latencies) / elapsed, sum(found)))
+    print("latency " + "  ".join(
+        ["p%d %.1f ms" % (percent, 1000 * percentile(latencies, percent))
+         for percent in PERCENTILES]))
+
+
+def main():
+    """
+    Run the load test from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Load test the Word Wrangler server.")
+    parser.add_argument("wordfile")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--players", type=int, default=2000)
+    parser.add_argument("--guesses", type=int, default=20)
+    parser.add_argument("--puzzles", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--serve", action="store_true",
+                        help="run the server in this process")
+    args = parser.parse_args()
+    words = word_cache.load_words(args.wordfile)
+    asyncio.run(run(args, words))
+
+
+if __name__ == "__main__":
+    main()
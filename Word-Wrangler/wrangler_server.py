@@ -0,0 +1,223 @@
+"""
+Headless Word Wrangler game server (Python 3).
+
+Serves any number of players over TCP with asyncio.  All sessions share
+one read-only WordIndex of the dictionary.  Each puzzle word is solved
+once, when a session first asks for it: its target words are kept as a
+sorted tuple with a dict from word to bit number, shared by every
+session on that puzzle.  A session only holds its puzzle and an integer
+bitmask of the targets found so far, so a guess is one dict lookup and
+one bit test.
+
+Protocol, one command per line:
+
+    NEW [word]      start a puzzle, random if no word is given
+                    -> PUZZLE <scrambled letters> <number of targets>
+    GUESS <word>    -> FOUND <found> <total>, ALREADY or MISS
+    STATUS          -> STATUS <found> <total>
+    QUIT            -> BYE, and the connection is closed
+
+Errors are answered with ERR and a reason.
+
+Usage: python3 wrangler_server.py WORDFILE --port 8765
+"""
+
+import argparse
+import asyncio
+import random
+
+import word_cache
+import word_index
+
+MIN_PUZZLE_LENGTH = 6
+MAX_PUZZLE_LENGTH = 9
+
+# Puzzles kept in memory at once.
+MAX_PUZZLES = 10000
+
+
+class Puzzle:
+    """
+    Target words of one puzzle word.
+    """
+    __slots__ = ("word", "letters", "targets", "bits")
+
+    def __init__(self, word, targets, rng):
+        self.word = word
+        letters = list(word)
+        rng.shuffle(letters)
+        self.letters = "".join(letters)
+        self.targets = tuple(targets)
+        self.bits = dict((target, 1 << index)
+                         for index, target in enumerate(self.targets))
+
+
+class Session:
+    """
+    State of one player: a puzzle and the bitmask of found targets.
+    """
+    __slots__ = ("puzzle", "found", "count")
+
+    def __init__(self, puzzle):
+        self.puzzle = puzzle
+        self.found = 0
+        self.count = 0
+
+
+class WranglerService:
+    """
+    Game logic shared by all connections.
+    """
+    def __init__(self, words, seed=None):
+        """
+        words is a sorted sequence of dictionary words, such as a
+        word_cache.WordList.
+        """
+        self._index = word_index.WordIndex(words)
+        self._rng = random.Random(seed)
+        self._candidates = [word for word in words
+                            if MIN_PUZZLE_LENGTH <= len(word) <=
+                            MAX_PUZZLE_LENGTH]
+        self._puzzles = {}
+
+    def get_puzzle(self, word):
+        """
+        Return the Puzzle for word, solving it on first use.
+        """
+        puzzle = self._puzzles.get(word)
+        if puzzle is None:
+            if len(self._puzzles) >= MAX_PUZZLES:
+                self._puzzles.clear()
+            puzzle = Puzzle(word, self._index.words_from_letters(word),
+                            self._rng)
+            self._puzzles[word] = puzzle
+        return puzzle
+
+    def new_session(self, word=None):
+        """
+        Return a Session on the puzzle word, or on a random puzzle.
+        Raises ValueError if word is not in the dictionary.
+        """
+        if word is None:
+            if not self._candidates:
+                raise ValueError("no puzzle words in the dictionary")
+            word = self._rng.choice(self._candidates)
+        elif word not in self._index:
+            raise ValueError("not a dictionary word")
+        return Session(self.get_puzzle(word))
+
+    def guess(self, session, word):
+        """
+        Record a guess and return the reply line.
+        """
+        bit = session.puzzle.bits.get(word)
+        if bit is None:
+            return "MISS"
+        if session.found & bit:
+            return "ALREADY"
+        session.found |= bit
+        session.count += 1
+        return "FOUND %d %d" % (session.count, len(session.puzzle.targets))
+
+    def handle_line(self, session, line):
+        """
+        Run one protocol command.  Returns (session, reply line, done).
+        """
+        parts = line.split()
+        if not parts:
+            return session, "ERR empty command", False
+        command = parts[0].upper()
+        if command == "NEW":
+            if len(parts) > 2:
+                return session, "ERR usage: NEW [word]", False
+            try:
+                session = self.new_session(parts[1] if len(parts) == 2
+                                           else None)
+            except ValueError as error:
+                return session, "ERR %s" % error, False
+            puzzle = session.puzzle
+            return session, "PUZZLE %s %d" % (puzzle.letters,
+                                              len(puzzle.targets)), False
+        if command == "QUIT":
+            return session, "BYE", True
+        if session is None:
+            return session, "ERR no puzzle, send NEW first", False
+        if command == "GUESS":
+            if len(parts) != 2:
+                return session, "ERR usage: GUESS word", False
+            return session, self.guess(session, parts[1]), False
+        if command == "STATUS":
+            return session, "STATUS %d %d" % (
+                session.count, len(session.puzzle.targets)), False
+        return session, "ERR unknown command", False
+
+
+class WranglerServer:
+    """
+    asyncio TCP front end of a WranglerService.
+    """
+    def __init__(self, service):
+        self._service = service
+        self._connections = 0
+
+    def get_connections(self):
+        """
+        Return the number of open connections.
+        """
+        return self._connections
+
+    async def handle_client(self, reader, writer):
+        """
+        Serve one connection until QUIT or end of input.
+        """
+        self._connections += 1
+        session = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                session, reply, done = self._service.handle_line(
+                    session, line.decode("utf-8", "replace"))
+                writer.write(reply.encode("utf-8") + b"\n")
+                await writer.drain()
+                if done:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            self._connections -= 1
+            writer.close()
+
+    async def serve(self, host, port):
+        """
+        Accept connections until cancelled.
+        """
+        server = await asyncio.start_server(self.handle_client, host, port,
+                                            backlog=4096)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """
+    Run the server from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Serve Word Wrangler games over TCP.")
+    parser.add_argument("wordfile")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    service = WranglerService(word_cache.load_words(args.wordfile),
+                              args.seed)
+    print("serving on %s:%d" % (args.host, args.port))
+    try:
+        asyncio.run(WranglerServer(service).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@ Planner for Yahtzee
 Simplifications:  only allow discard and roll, only score against upper level
 """
 
-# Used to increase the timeout, if necessary
-import codeskulptor
-codeskulptor.set_timeout(20)
+# Memoized results: sorted rolls with their probabilities per
+# (num_die_sides, num_free_dice), scores per sorted hand, and expected
+# values per (held_dice, num_die_sides, num_free_dice).
+_ROLL_CACHE = {}
+_SCORE_CACHE = {}
+_EXPECTED_CACHE = {}
 
 def gen_all_sequences(outcomes, length):
     """
@@ -25,6 +28,40 @@ def gen_all_sequences(outcomes, length):
     return answer_set
 
 
+def gen_sorted_rolls(num_die_sides, num_free_dice):
+    """
+    Enumerate the distinct outcomes of rolling num_free_dice dice with
+    num_die_sides sides, ignoring order.
+
+    Returns a list of (sorted roll, probability) pairs: 252 pairs for
+    five six-sided dice instead of 7776 sequences.
+    """
+    key = (num_die_sides, num_free_dice)
+    if key not in _ROLL_CACHE:
+        rolls = [()]
+        for dummy_idx in range(num_free_dice):
+            longer = []
+            for roll in rolls:
+                lowest = 1
+                if roll:
+                    lowest = roll[-1]
+                for die in range(lowest, num_die_sides + 1):
+                    longer.append(roll + (die,))
+            rolls = longer
+        factorial = [1]
+        for number in range(1, num_free_dice + 1):
+            factorial.append(factorial[-1] * number)
+        total = float(num_die_sides ** num_free_dice)
+        pairs = []
+        for roll in rolls:
+            orderings = factorial[num_free_dice]
+            for die in set(roll):
+                orderings //= factorial[roll.count(die)]
+            pairs.append((roll, orderings / total))
+        _ROLL_CACHE[key] = pairs
+    return _ROLL_CACHE[key]
+
+
 def score(hand):
     """
     Compute the maximal score for a Yahtzee hand according to the
@@ -42,13 +79,12 @@ def score(hand):
     The function score(hand) computes a score for hand as the maximum of the possible values
     for each choice of box in the upper section of the Yahtzee scorecard.
     """
-    scores = dict([])
-    for dice in hand:
-        if scores.has_key(dice):
-            scores[dice] += dice
-        else:
-            scores[dice] = dice
-    return max(scores.values())
+    if hand not in _SCORE_CACHE:
+        scores = dict([])
+        for dice in hand:
+            scores[dice] = scores.get(dice, 0) + dice
+        _SCORE_CACHE[hand] = max(scores.values())
+    return _SCORE_CACHE[hand]
 
 
 def expected_value(held_dice, num_die_sides, num_free_dice):
@@ -67,18 +103,19 @@ def expected_value(held_dice, num_die_sides, num_free_dice):
     The dice being held are specified by the sorted tuple held_dice. 
     The number of sides and the number of dice that are free to be rolled 
     are specified by num_die_sides and num_free_dice, respectively. 
-    You should use gen_all_sequences to compute all possible rolls for the dice being rolled.
-    As an example, in a standard Yahtzee game using five dice, 
+    The rolls are enumerated once per (num_die_sides, num_free_dice) as
+    sorted multisets with their probabilities, by gen_sorted_rolls.
+    As an example, in a standard Yahtzee game using five dice,
     the length of held_dice plus num_free_dice should always be five.
     """
-    all_rolls = gen_all_sequences(range(1, num_die_sides + 1), num_free_dice)
-    probability = (1.0 / num_die_sides) ** num_free_dice
-    expected = 0.0
-    for roll in all_rolls:
-        max_score = score(roll+held_dice)
-        expected += max_score
-    expected *= probability
-    return expected
+    key = (held_dice, num_die_sides, num_free_dice)
+    if key not in _EXPECTED_CACHE:
+        expected = 0.0
+        for roll, probability in gen_sorted_rolls(num_die_sides,
+                                                  num_free_dice):
+            expected += probability * score(tuple(sorted(held_dice + roll)))
+        _EXPECTED_CACHE[key] = expected
+    return _EXPECTED_CACHE[key]
 
 
 def gen_all_holds(hand):
@@ -155,7 +192,8 @@ def run_example():
     num_die_sides = 6
     hand = (1, 1, 1, 5, 6)
     hand_score, hold = strategy(hand, num_die_sides)
-    print "Best strategy for hand", hand, "is to hold", hold, "with expected score", hand_score
+    print("Best strategy for hand " + str(hand) + " is to hold " + str(hold) +
+          " with expected score " + str(hand_score))
     
     
 #run_example()
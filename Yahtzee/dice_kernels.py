@@ -0,0 +1,230 @@
+"""
+NumPy tables for Yahtzee dice, for any number of dice and sides.
+
+Hands and holds are stored as count vectors: entry i is the number of
+dice showing i + 1.  DiceKernels builds, once:
+
+- the hands (every sorted roll of all the dice) and the holds (every
+  sorted set of kept dice, from none to all of them), in the order of
+  Yahtzee.gen_sorted_rolls;
+- the transition matrix, where entry (hold, hand) is the probability of
+  ending with hand after keeping hold and rolling the other dice;
+- for every hand, the indices of the holds it contains.
+
+With these, the expected values of every hold are one matrix-vector
+product with the scores of the hands, and strategy_all solves
+Yahtzee.strategy for every hand at once.
+"""
+
+import numpy
+
+import Yahtzee
+
+
+def _count_vectors(rolls, num_die_sides):
+    """
+    Return the count vectors of a list of sorted rolls.
+    """
+    counts = numpy.zeros((len(rolls), num_die_sides), dtype=numpy.int64)
+    for row, roll in enumerate(rolls):
+        for die in roll:
+            counts[row, die - 1] += 1
+    return counts
+
+
+class DiceKernels:
+    """
+    Hands, holds and transition probabilities of num_dice dice with
+    num_die_sides sides.
+    """
+    def __init__(self, num_dice=5, num_die_sides=6):
+        self._num_dice = num_dice
+        self._num_die_sides = num_die_sides
+        self._hands = [roll for roll, dummy_prob
+                       in Yahtzee.gen_sorted_rolls(num_die_sides, num_dice)]
+        self._holds = []
+        for size in range(num_dice + 1):
+            self._holds.extend([roll for roll, dummy_prob
+                                in Yahtzee.gen_sorted_rolls(num_die_sides,
+                                                            size)])
+        self._hand_index = dict((hand, index)
+                                for index, hand in enumerate(self._hands))
+        self._hold_index = dict((hold, index)
+                                for index, hold in enumerate(self._holds))
+        self._hand_counts = _count_vectors(self._hands, num_die_sides)
+        self._hold_counts = _count_vectors(self._holds, num_die_sides)
+
+        # Dice rolled to get from each hold to each hand, per face.
+        rolled = self._hand_counts[None, :, :] - self._hold_counts[:, None, :]
+        reachable = (rolled >= 0).all(axis=2)
+        rolled = numpy.maximum(rolled, 0)
+        factorial = numpy.cumprod([1.0] + list(range(1, num_dice + 1)))
+        free = num_dice - self._hold_counts.sum(axis=1)
+        orderings = (factorial[free][:, None] /
+                     factorial[rolled].prod(axis=2))
+        self._transition = numpy.where(
+            reachable, orderings / (float(num_die_sides) ** free)[:, None],
+            0.0)
+
+        contains = reachable.T
+        width = contains.sum(axis=1).max()
+        self._hold_indices = numpy.zeros((len(self._hands), width),
+                                         dtype=numpy.int64)
+        for row in range(len(self._hands)):
+            indices = numpy.flatnonzero(contains[row])
+            self._hold_indices[row, :len(indices)] = indices
+            # Pad with a hold of the hand, so maxima are unchanged.
+            self._hold_indices[row, len(indices):] = indices[0]
+
+    def get_num_dice(self):
+        """
+        Return the number of dice.
+        """
+        return self._num_dice
+
+    def get_num_die_sides(self):
+        """
+        Return the number of sides of each die.
+        """
+        return self._num_die_sides
+
+    def get_hands(self):
+        """
+        Return the list of sorted hands.
+        """
+        return self._hands
+
+    def get_holds(self):
+        """
+        Return the list of sorted holds.
+        """
+        return self._holds
+
+    def hand_index(self, hand):
+        """
+        Return the row of a sorted hand in the tables.
+        """
+        return self._hand_index[hand]
+
+    def hold_index(self, hold):
+        """
+        Return the row of a sorted hold in the tables.
+        """
+        return self._hold_index[hold]
+
+    def get_hand_counts(self):
+        """
+        Return the (hands, sides) array of count vectors of the hands.
+        """
+        return self._hand_counts
+
+    def get_hold_counts(self):
+        """
+        Return the (holds, sides) array of count vectors of the holds.
+        """
+        return self._hold_counts
+
+    def get_transition(self):
+        """
+        Return the (holds, hands) transition probability matrix.
+        """
+        return self._transition
+
+    def get_hold_indices(self):
+        """
+        Return the (hands, width) array of the hold indices of each
+        hand, padded with repeats.
+        """
+        return self._hold_indices
+
+    def first_roll(self):
+        """
+        Return the probability of each hand on a roll of every die.
+        """
+        return self._transition[0]
+
+    def upper_scores(self):
+        """
+        Return the score of every hand by Yahtzee.score: the best box
+        of the upper section.
+        """
+        faces = numpy.arange(1, self._num_die_sides + 1)
+        return (self._hand_counts * faces).max(axis=1)
+
+    def best_holds(self, values):
+        """
+        Given the values of the hands after a roll, as a (hands,) or
+        (hands, n) array, return the values before the roll with the
+        best hold, and the index of that hold.
+        """
+        hold_values = numpy.dot(self._transition, values)
+        options = hold_values[self._hold_indices]
+        choice = options.argmax(axis=1)
+        if values.ndim == 1:
+            rows = numpy.arange(len(self._hands))
+        else:
+            rows = numpy.arange(len(self._hands))[:, None]
+        return options.max(axis=1), self._hold_indices[rows, choice]
+
+    def best_hold_values(self, values):
+        """
+        Same as the values returned by best_holds, without the choices.
+        """
+        hold_values = numpy.dot(self._transition, values)
+        return hold_values[self._hold_indices].max(axis=1)
+
+
+def box_scores(kernels):
+    """
+    Return the (hands, 13) array of the score of every hand in every
+    Yahtzee score card box: the upper boxes, three and four of a kind,
+    full house (25), small and large straight (30 and 40), Yahtzee (50)
+    and chance.  Straights are runs of 4 and 5 consecutive faces.
+
+    The score card is for five dice, so other numbers of dice raise
+    ValueError.  Upper boxes of faces the dice do not have score 0.
+    """
+    if kernels.get_num_dice() != 5:
+        raise ValueError("the score card needs 5 dice, not %d" %
+                         kernels.get_num_dice())
+    counts = kernels.get_hand_counts()
+    num_die_sides = kernels.get_num_die_sides()
+    faces = numpy.arange(1, num_die_sides + 1)
+    total = numpy.dot(counts, faces)
+    most = counts.max(axis=1)
+    present = counts > 0
+
+    def has_run(length):
+        """
+        True for the hands with length consecutive faces.
+        """
+        found = numpy.zeros(len(counts), dtype=bool)
+        for low in range(num_die_sides - length + 1):
+            found |= present[:, low:low + length].all(axis=1)
+        return found
+
+    upper = numpy.zeros((len(counts), 6), dtype=counts.dtype)
+    upper[:, :min(6, num_die_sides)] = counts[:, :6] * faces[:6]
+    lower = numpy.column_stack([
+        numpy.where(most >= 3, total, 0),
+        numpy.where(most >= 4, total, 0),
+        numpy.where((counts == 3).any(axis=1) & (counts == 2).any(axis=1),
+                    25, 0),
+        numpy.where(has_run(4), 30, 0),
+        numpy.where(has_run(5), 40, 0),
+        numpy.where(most == kernels.get_num_dice(), 50, 0),
+        total])
+    return numpy.hstack([upper, lower])
+
+
+def strategy_all(kernels, scores=None):
+    """
+    Solve Yahtzee.strategy for every hand at once: return the array of
+    best expected values and the list of holds, one per hand, for one
+    more roll scored by scores (by default the upper section score).
+    """
+    if scores is None:
+        scores = kernels.upper_scores()
+    values, choices = kernels.best_holds(numpy.asarray(scores, dtype=float))
+    holds = kernels.get_holds()
+    return values, [holds[index] for index in choices]
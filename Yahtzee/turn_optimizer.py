@@ -0,0 +1,286 @@
+"""
+Optimal holds over a whole Yahtzee turn.
+
+A turn is three rolls: after the first and the second roll the player
+keeps some dice and rolls the rest, and after the third roll the hand
+is scored.  TurnOptimizer solves the turn by backward induction: the
+value of a hand after the third roll is its score, and the value of a
+hand after an earlier roll is the best expected value over its holds of
+the value after the next roll.  Every (roll number, sorted hand) pair
+gets its best hold and expected value, so advice is a dict lookup.
+
+The score function is pluggable and defaults to Yahtzee.score, the
+best upper-section box.  Tables can be cached on disk with save and
+load_optimizer; the cache records the module and name of the score
+function, and get_optimizer solves again when they do not match.
+
+Usage: python turn_optimizer.py --dice 5 --sides 6 --cache turn.bin
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import timeit
+
+import Yahtzee
+
+ROLLS_PER_TURN = 3
+
+TABLE_MAGIC = b"YTRN"
+TABLE_VERSION = 2
+# magic, version, number of dice, number of sides, number of hands,
+# length of the score name that follows
+TABLE_HEADER = struct.Struct("<4sBBBIH")
+# hold as a bitmask of positions in the sorted hand, expected value
+TABLE_ENTRY = struct.Struct("<Hd")
+
+_replace = getattr(os, "replace", os.rename)
+
+
+def _set_default_mode(path):
+    """
+    Set the mode of path to 0666 less the umask, which is what open()
+    gives new files; mkstemp leaves them at 0600.
+    """
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(path, 0o666 & ~umask)
+
+
+def hold_mask(hand, hold):
+    """
+    Return the bitmask of the positions of the sorted hand that make up
+    the sorted hold, using the first matching positions.
+    """
+    mask = 0
+    position = 0
+    for die in hold:
+        while hand[position] != die or mask >> position & 1:
+            position += 1
+        mask |= 1 << position
+        position += 1
+    return mask
+
+
+def score_name(score):
+    """
+    Return the name a table cache records for the score function score,
+    as module.name.
+    """
+    return "%s.%s" % (score.__module__, score.__name__)
+
+
+def mask_hold(hand, mask):
+    """
+    Return the dice of hand at the positions set in mask.
+    """
+    return tuple([hand[position] for position in range(len(hand))
+                  if mask >> position & 1])
+
+
+class TurnOptimizer:
+    """
+    Best hold and expected score for every hand after every roll.
+    """
+    def __init__(self, num_dice=5, num_die_sides=6, score=Yahtzee.score,
+                 tables=None, name=None):
+        """
+        Solve the turn for num_dice dice with num_die_sides sides,
+        scoring the final hand with score, unless tables (as built by
+        load_optimizer) are given.  name is the score_name of the score
+        function, by default that of score.
+        """
+        self._num_dice = num_dice
+        self._num_die_sides = num_die_sides
+        if name is None:
+            name = score_name(score)
+        self._score_name = name
+        self._first_roll = Yahtzee.gen_sorted_rolls(num_die_sides, num_dice)
+        self._hands = [hand for hand, dummy_prob in self._first_roll]
+        if tables is None:
+            tables = self._solve(score)
+        self._tables = tables
+
+    def _solve(self, score):
+        """
+        Return one dict per roll from sorted hand to (expected value,
+        best hold), by backward induction from the last roll.
+        """
+        last = dict((hand, (float(score(hand)), hand))
+                    for hand in self._hands)
+        tables = [last]
+        for dummy_roll in range(ROLLS_PER_TURN - 1):
+            following = tables[0]
+            hold_values = {}
+            table = {}
+            for hand in self._hands:
+                best = None
+                for hold in Yahtzee.gen_all_holds(hand):
+                    hold = tuple(sorted(hold))
+                    if hold not in hold_values:
+                        hold_values[hold] = self._hold_value(hold, following)
+                    value = hold_values[hold]
+                    if best is None or value > best[0] or (
+                            value == best[0] and len(hold) > len(best[1])):
+                        best = (value, hold)
+                table[hand] = best
+            tables.insert(0, table)
+        return tables
+
+    def _hold_value(self, hold, following):
+        """
+        Expected value of holding hold and rolling the other dice, when
+        following gives the value of each hand after that roll.
+        """
+        expected = 0.0
+        for roll, probability in Yahtzee.gen_sorted_rolls(
+                self._num_die_sides, self._num_dice - len(hold)):
+            expected += probability * following[
+                tuple(sorted(hold + roll))][0]
+        return expected
+
+    def advise(self, hand, roll_number):
+        """
+        Return (expected score, dice to hold) for a sorted hand after
+        roll roll_number (1 to 3) of the turn.
+        """
+        return self._tables[roll_number - 1][hand]
+
+    def get_num_dice(self):
+        """
+        Return the number of dice.
+        """
+        return self._num_dice
+
+    def get_num_die_sides(self):
+        """
+        Return the number of sides of each die.
+        """
+        return self._num_die_sides
+
+    def get_score_name(self):
+        """
+        Return the score_name of the score function of the tables.
+        """
+        return self._score_name
+
+    def get_hands(self):
+        """
+        Return the list of sorted hands.
+        """
+        return list(self._hands)
+
+    def expected_turn_value(self):
+        """
+        Return the expected score of a turn played with the best holds.
+        """
+        first = self._tables[0]
+        return sum([probability * first[hand][0]
+                    for hand, probability in self._first_roll])
+
+    def save(self, path):
+        """
+        Write the tables to path, through a temporary file.
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        name = self._score_name.encode("utf-8")
+        try:
+            with os.fdopen(handle, "wb") as table_file:
+                table_file.write(TABLE_HEADER.pack(
+                    TABLE_MAGIC, TABLE_VERSION, self._num_dice,
+                    self._num_die_sides, len(self._hands), len(name)))
+                table_file.write(name)
+                for table in self._tables:
+                    for hand in self._hands:
+                        value, hold = table[hand]
+                        table_file.write(TABLE_ENTRY.pack(
+                            hold_mask(hand, hold), value))
+            _set_default_mode(temp_path)
+            _replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+
+def load_optimizer(path):
+    """
+    Return a TurnOptimizer with the tables saved in path.
+    """
+    with open(path, "rb") as table_file:
+        data = table_file.read()
+    magic, version = TABLE_HEADER.unpack_from(data, 0)[:2]
+    if magic != TABLE_MAGIC or version != TABLE_VERSION:
+        raise ValueError("not a turn table: %s" % path)
+    num_dice, num_die_sides, num_hands, name_length = \
+        TABLE_HEADER.unpack_from(data, 0)[2:]
+    hands = [hand for hand, dummy_prob
+             in Yahtzee.gen_sorted_rolls(num_die_sides, num_dice)]
+    if len(hands) != num_hands:
+        raise ValueError("turn table does not match its dice: %s" % path)
+    offset = TABLE_HEADER.size + name_length
+    name = data[TABLE_HEADER.size:offset].decode("utf-8")
+    tables = []
+    for dummy_roll in range(ROLLS_PER_TURN):
+        table = {}
+        for hand in hands:
+            mask, value = TABLE_ENTRY.unpack_from(data, offset)
+            offset += TABLE_ENTRY.size
+            table[hand] = (value, mask_hold(hand, mask))
+        tables.append(table)
+    return TurnOptimizer(num_dice, num_die_sides, tables=tables, name=name)
+
+
+def get_optimizer(path, num_dice=5, num_die_sides=6, score=Yahtzee.score):
+    """
+    Load the tables cached in path, or solve them and save them there
+    when the cache is missing, from an older version, or for other dice
+    or another score function.
+    """
+    if os.path.exists(path):
+        try:
+            optimizer = load_optimizer(path)
+        except ValueError:
+            optimizer = None
+        if (optimizer is not None and
+                optimizer.get_num_dice() == num_dice and
+                optimizer.get_num_die_sides() == num_die_sides and
+                optimizer.get_score_name() == score_name(score)):
+            return optimizer
+    optimizer = TurnOptimizer(num_dice, num_die_sides, score)
+    optimizer.save(path)
+    return optimizer
+
+
+def main():
+    """
+    Solve a turn, optionally through a cache file, and time lookups.
+    """
+    parser = argparse.ArgumentParser(
+        description="Solve the holds of a Yahtzee turn.")
+    parser.add_argument("--dice", type=int, default=5)
+    parser.add_argument("--sides", type=int, default=6)
+    parser.add_argument("--cache", default=None)
+    args = parser.parse_args()
+    start = timeit.default_timer()
+    if args.cache:
+        optimizer = get_optimizer(args.cache, args.dice, args.sides)
+    else:
+        optimizer = TurnOptimizer(args.dice, args.sides)
+    elapsed = timeit.default_timer() - start
+    print("turn solved in %.3f s, expected score %.4f" %
+          (elapsed, optimizer.expected_turn_value()))
+    hands = optimizer.get_hands()
+    advise = optimizer.advise
+    start = timeit.default_timer()
+    for dummy_repeat in range(100):
+        for hand in hands:
+            advise(hand, 1)
+            advise(hand, 2)
+    elapsed = timeit.default_timer() - start
+    print("%.0f lookups/sec" % (200 * len(hands) / elapsed))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Monte Carlo validator and benchmark for the Yahtzee strategies.
+
+Plays seeded turns or games with a policy and compares the mean score
+with the expected score the policy computes analytically:
+
+- strategy: one roll, one reroll of the dice not held by
+  Yahtzee.strategy, scored by Yahtzee.score.  The expected score is the
+  mean of the values of strategy over the first roll.
+- optimal: a three roll turn with the holds of turn_optimizer, scored
+  by Yahtzee.score.  The expected score is expected_turn_value.
+- game: a whole game with the decisions of a game_solver table, from
+  --table.  The expected score is GameSolver.expected_score.
+
+Plays are split into batches run over a process pool.  Each batch has
+its own random.Random seeded from the seed and the batch index, so the
+results do not depend on the number of workers.  The report gives the
+mean and variance of the score, plays per second, and the z score of
+the mean against the expected score.  With --max-z the simulator exits
+with status 1 when |z| is larger, so it can be used as a regression
+check.
+
+Usage: python yahtzee_sim.py optimal --plays 100000 --workers 4
+"""
+
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import timeit
+
+import Yahtzee
+import turn_optimizer
+
+POLICIES = ("strategy", "optimal", "game")
+
+SEED_MULTIPLIER = 1000003
+
+# Per-process cache of the policies built by make_policy.
+_POLICIES = {}
+
+
+def roll_dice(rng, num_dice, num_die_sides):
+    """
+    Return a tuple of num_dice random dice.
+    """
+    return tuple([1 + int(num_die_sides * rng.random())
+                  for dummy_die in range(num_dice)])
+
+
+class StrategyPolicy:
+    """
+    One reroll of the dice not held by Yahtzee.strategy.
+    """
+    def __init__(self, num_dice=5, num_die_sides=6):
+        self._num_dice = num_dice
+        self._num_die_sides = num_die_sides
+        self._first_roll = Yahtzee.gen_sorted_rolls(num_die_sides, num_dice)
+        self._strategy = dict((hand, Yahtzee.strategy(hand, num_die_sides))
+                              for hand, dummy_prob in self._first_roll)
+
+    def expected_score(self):
+        """
+        Return the expected score of a turn.
+        """
+        return sum([probability * self._strategy[hand][0]
+                    for hand, probability in self._first_roll])
+
+    def play(self, rng):
+        """
+        Play one turn and return its score.
+        """
+        hand = tuple(sorted(roll_dice(rng, self._num_dice,
+                                      self._num_die_sides)))
+        hold = self._strategy[hand][1]
+        hand = hold + roll_dice(rng, self._num_dice - len(hold),
+                                self._num_die_sides)
+        return Yahtzee.score(tuple(sorted(hand)))
+
+
+class OptimalTurnPolicy:
+    """
+    A three roll turn with the holds of a TurnOptimizer.
+    """
+    def __init__(self, num_dice=5, num_die_sides=6, cache=None):
+        self._num_dice = num_dice
+        self._num_die_sides = num_die_sides
+        if cache:
+            self._optimizer = turn_optimizer.get_optimizer(
+                cache, num_dice, num_die_sides)
+        else:
+            self._optimizer = turn_optimizer.TurnOptimizer(num_dice,
+                                                           num_die_sides)
+
+    def expected_score(self):
+        """
+        Return the expected score of a turn.
+        """
+        return self._optimizer.expected_turn_value()
+
+    def play(self, rng):
+        """
+        Play one turn and return its score.
+        """
+        hand = tuple(sorted(roll_dice(rng, self._num_dice,
+                                      self._num_die_sides)))
+        for roll_number in range(1, turn_optimizer.ROLLS_PER_TURN):
+            hold = self._optimizer.advise(hand, roll_number)[1]
+            hand = tuple(sorted(hold + roll_dice(
+                rng, self._num_dice - len(hold), self._num_die_sides)))
+        return Yahtzee.score(hand)
+
+
+class GamePolicy:
+    """
+    A whole game with the decisions of a game_solver table.
+    """
+    def __init__(self, path):
+        # Imported here so the turn policies do not need numpy.
+        import dice_kernels
+        import game_solver
+        self._game_solver = game_solver
+        self._solver = game_solver.GameSolver(path)
+        self._kernels = self._solver.get_kernels()
+        self._scores = dice_kernels.box_scores(self._kernels)
+
+    def expected_score(self):
+        """
+        Return the expected score of a game.
+        """
+        return self._solver.expected_score()
+
+    def play(self, rng):
+        """
+        Play one game and return its score.
+        """
+        solver = self._game_solver
+        kernels = self._kernels
+        holds = kernels.get_holds()
+        mask = 0
+        upper_total = 0
+        total = 0
+        for dummy_turn in range(solver.NUM_BOXES):
+            hold_choices, box_choices = self._solver.plan_turn(mask,
+                                                               upper_total)
+            hand = tuple(sorted(roll_dice(rng, solver.NUM_DICE,
+                                          solver.NUM_DIE_SIDES)))
+            for rolls_left in range(solver.ROLLS_PER_TURN - 1, 0, -1):
+                index = hold_choices[rolls_left - 1][
+                    kernels.hand_index(hand)]
+                hold = holds[index]
+                hand = tuple(sorted(hold + roll_dice(
+                    rng, solver.NUM_DICE - len(hold),
+                    solver.NUM_DIE_SIDES)))
+            row = kernels.hand_index(hand)
+            box = int(box_choices[row])
+            points = int(self._scores[row, box])
+            if box < 6:
+                if (upper_total < solver.UPPER_BONUS_THRESHOLD <=
+                        upper_total + points):
+                    total += solver.UPPER_BONUS
+                upper_total += points
+            total += points
+            mask |= 1 << box
+        return total
+
+
+def make_policy(spec):
+    """
+    Return the policy for spec, (policy name, number of dice, number of
+    sides, path), built once per process.  path is the turn cache of
+    optimal and the table of game.
+    """
+    if spec not in _POLICIES:
+        name, num_dice, num_die_sides, path = spec
+        if name == "strategy":
+            policy = StrategyPolicy(num_dice, num_die_sides)
+        elif name == "optimal":
+            policy = OptimalTurnPolicy(num_dice, num_die_sides, path)
+        elif name == "game":
+            if not path:
+                raise ValueError("the game policy needs a table")
+            policy = GamePolicy(path)
+        else:
+            raise ValueError("unknown policy %r" % name)
+        _POLICIES[spec] = policy
+    return _POLICIES[spec]
+
+
+def run_batch(task):
+    """
+    Play one batch.  task is (spec, number of plays, seed).  Returns
+    (count, mean, sum of squared deviations from the mean, seconds
+    spent playing).
+    """
+    spec, count, seed = task
+    policy = make_policy(spec)
+    rng = random.Random(seed)
+    start = timeit.default_timer()
+    scores = [policy.play(rng) for dummy_play in range(count)]
+    elapsed = timeit.default_timer() - start
+    mean = float(sum(scores)) / count
+    squares = sum([(score - mean) ** 2 for score in scores])
+    return count, mean, squares, elapsed
+
+
+class _Summary:
+    """
+    Combined results of the batches of a run.
+    """
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.squares = 0.0
+        self.play_seconds = 0.0
+        self.seconds = 0.0
+
+    def add(self, count, mean, squares, seconds):
+        """
+        Merge the results of one batch.
+        """
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.squares += squares + delta * delta * self.count * count / total
+        self.count = total
+        self.play_seconds += seconds
+
+    def variance(self):
+        """
+        Return the sample variance of the scores.
+        """
+        if self.count < 2:
+            return 0.0
+        return self.squares / (self.count - 1)
+
+    def z_score(self, expected):
+        """
+        Return how many standard errors the mean is from expected.
+        """
+        error = math.sqrt(self.variance() / max(1, self.count))
+        if error == 0.0:
+            if self.mean == expected:
+                return 0.0
+            return float("inf")
+        return (self.mean - expected) / error
+
+
+def run_simulation(spec, plays, batch_size=1000, workers=None, seed=0):
+    """
+    Play plays turns or games with the policy of spec and return a
+    _Summary.
+    """
+    tasks = []
+    for index, start in enumerate(range(0, plays, batch_size)):
+        batch_seed = (seed * SEED_MULTIPLIER + index) % (2 ** 32)
+        tasks.append((spec, min(batch_size, plays - start), batch_seed))
+    start = timeit.default_timer()
+    if workers == 1:
+        results = [run_batch(task) for task in tasks]
+    else:
+        pool = multiprocessing.Pool(workers)
+        try:
+            results = pool.map(run_batch, tasks)
+        finally:
+            pool.close()
+            pool.join()
+    summary = _Summary()
+    for result in results:
+        summary.add(*result)
+    summary.seconds = timeit.default_timer() - start
+    return summary
+
+
+def main():
+    """
+    Run a simulation from the command line.
+    """
+    parser = argparse.ArgumentParser(
+        description="Check a Yahtzee policy against its expected score.")
+    parser.add_argument("policy", choices=POLICIES)
+    parser.add_argument("--plays", type=int, default=10000,
+                        help="turns, or games for the game policy")
+    parser.add_argument("--dice", type=int, default=5)
+    parser.add_argument("--sides", type=int, default=6)
+    parser.add_argument("--cache", default=None,
+                        help="turn table cache of the optimal policy")
+    parser.add_argument("--table", default=None,
+                        help="game_solver table of the game policy")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--max-z", type=float, default=None,
+                        help="fail if the mean is more than this many "
+                        "standard errors from the expected score")
+    args = parser.parse_args()
+    if args.policy == "game":
+        spec = (args.policy, 5, 6, args.table)
+    elif args.policy == "optimal":
+        spec = (args.policy, args.dice, args.sides, args.cache)
+    else:
+        spec = (args.policy, args.dice, args.sides, None)
+    expected = make_policy(spec).expected_score()
+    summary = run_simulation(spec, args.plays, args.batch_size,
+                             args.workers, args.seed)
+    z_score = summary.z_score(expected)
+    print("%s: %d plays" % (args.policy, summary.count))
+    print("  mean %.4f  variance %.4f  expected %.4f" %
+          (summary.mean, summary.variance(), expected))
+    print("  difference %+.4f  z %+.2f" % (summary.mean - expected, z_score))
+    print("  %.2f s, %.0f plays/sec, %.0f plays/sec per worker" %
+          (summary.seconds, summary.count / summary.seconds,
+           summary.count / max(summary.play_seconds, 1e-9)))
+    if args.max_z is not None and abs(z_score) > args.max_z:
+        print("FAIL: |z| %.2f is above %.2f" % (abs(z_score), args.max_z))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()